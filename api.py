@@ -17,7 +17,7 @@ from fastapi.responses import RedirectResponse, JSONResponse
 from pydantic import BaseModel
 
 # Import from existing modules
-from prompt_service import PromptService
+from prompt_service import PromptService, ExampleStore
 
 # Try to import gmail categorizer for testing
 try:
@@ -63,6 +63,7 @@ app.add_middleware(
 
 # Initialize prompt service and email index
 prompt_service = PromptService(PROMPT_DB_PATH)
+example_store = ExampleStore(PROMPT_DB_PATH, prompt_service=prompt_service)
 try:
     from email_index import EmailIndex
     email_index = EmailIndex(EMAIL_INDEX_PATH)
@@ -943,10 +944,6 @@ async def evaluate_classifier(request: EvaluateRequest):
 async def get_few_shot_examples(limit: int = 10, category: Optional[str] = None):
     """Get few-shot examples from the example store."""
     try:
-        from prompt_service import ExampleStore
-        
-        example_store = ExampleStore(PROMPT_DB_PATH)
-        
         if category:
             examples = example_store.get_best_examples(category=category, k=limit)
         else:
@@ -978,10 +975,6 @@ async def add_few_shot_example(
 ):
     """Add a new few-shot example to the store."""
     try:
-        from prompt_service import ExampleStore
-        
-        example_store = ExampleStore(PROMPT_DB_PATH)
-        
         example_id = example_store.add_example(
             sender=sender,
             subject=subject,
@@ -1010,9 +1003,6 @@ async def add_few_shot_example(
 async def delete_few_shot_example(example_id: int):
     """Delete a few-shot example."""
     try:
-        from prompt_service import ExampleStore
-        
-        example_store = ExampleStore(PROMPT_DB_PATH)
         example_store.delete_example(example_id)
         
         return {
@@ -1032,9 +1022,6 @@ async def delete_few_shot_example(example_id: int):
 async def get_example_store_stats():
     """Get statistics about the example store."""
     try:
-        from prompt_service import ExampleStore
-        
-        example_store = ExampleStore(PROMPT_DB_PATH)
         stats = example_store.get_statistics()
         
         return {
@@ -1064,7 +1051,7 @@ async def startup_event():
     # Ensure database is initialized
     prompt_service._ensure_database()
     
-    active = prompt_service.get_active_prompt()
+    active = prompt_service.get_active_prompt_meta()
     if active:
         print(f"   Active prompt: {active['name']}")
     else:
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-import os, sys, time, json, base64, re, argparse, signal, logging
+import os, sys, time, json, base64, re, argparse, signal, logging, threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+from html import unescape
 from pathlib import Path
 
 # Gmail API
@@ -69,7 +71,6 @@ LABEL_TRIAGED   = os.getenv("LABEL_TRIAGED",   "AI_Triaged")
 # Processing settings
 DEFAULT_QUERY   = os.getenv("GMAIL_QUERY", "in:inbox newer_than:14d -label:%s" % LABEL_TRIAGED)
 MAX_RESULTS     = int(os.getenv("MAX_RESULTS", "40"))
-SLEEP_SECONDS   = float(os.getenv("SLEEP_SECONDS", "0.5"))
 TIMEOUT_SEC     = float(os.getenv("OPENAI_TIMEOUT", "45"))
 
 # Daemon mode settings
@@ -81,6 +82,13 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2.0"))
 
+# Max pooled keep-alive connections to the LLM endpoint
+LLM_MAX_CONN = int(os.getenv("LLM_MAX_CONN", "20"))
+
+# Circuit breaker: fail fast after N consecutive LLM failures, probe again after cooldown
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN  = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))
+
 # DSPy settings
 USE_DSPY = os.getenv("USE_DSPY", "false").lower() in ("true", "1", "yes")
 
@@ -91,6 +99,17 @@ PROMPT_DB_PATH = os.getenv("PROMPT_DB_PATH", "./data/prompts.db")
 # Tier 2: max chars for snippet-only classification (saves tokens)
 TIER2_SNIPPET_MAX = int(os.getenv("TIER2_SNIPPET_MAX", "2000"))
 
+# Threads fetched per Gmail batch; the next chunk is prefetched during classification
+PREFETCH_CHUNK = int(os.getenv("PREFETCH_CHUNK", "20"))
+
+# Max decoded bytes kept per MIME part (applied before HTML stripping)
+MAX_PART_BYTES = int(os.getenv("MAX_PART_BYTES", "32768"))
+
+# Daemon: prune classification logs and prompt test results older than this
+# many days from the prompt DB (0, the default, keeps everything)
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_CLEANUP_INTERVAL = 24 * 3600  # at most once a day, after an idle run
+
 # Tier 1: keyword heuristics for transactional (high priority)
 TRANSACTIONAL_KEYWORDS = [
     "receipt", "receipt for", "order confirm", "order confirmed",
@@ -98,8 +117,20 @@ TRANSACTIONAL_KEYWORDS = [
     "payment receiv", "purchase confirm", "your order", "tracking number",
 ]
 
+# Metadata pre-filter: headers fetched before deciding to download full MIME
+METADATA_HEADERS = ['From', 'Subject', 'List-Unsubscribe']
+POLITICAL_SENDER_RE = re.compile(r'actblue|winred|democracyengine', re.I)
+# Retailer TLDs, anchored to the end of the domain (sender address or "@host")
+ECOMMERCE_SENDER_RE = re.compile(r'@(?:[\w-]+\.)+(?:shop|store)(?=>|\s*$)', re.I)
+# Hosts of the List-Unsubscribe URLs/mailtos (query strings are ignored)
+UNSUB_HOST_RE = re.compile(r'(?:https?://|mailto:[^@>\s]*@)([\w.-]+)', re.I)
+# Extra sender/domain patterns (one per line) read from CREDENTIALS_PATH
+POLITICAL_SENDERS_FILE = "political_senders.txt"
+ECOMMERCE_SENDERS_FILE = "ecommerce_senders.txt"
+
 # ------- Global State -------
-shutdown_requested = False
+# Set by the signal handler; sleepers wait on it so shutdown is immediate
+shutdown_event = threading.Event()
 
 # ------- Logging Setup -------
 def setup_logging(level: str = "INFO"):
@@ -134,10 +165,9 @@ else:
 # ------- Signal Handlers -------
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
-    global shutdown_requested
     sig_name = signal.Signals(signum).name
     logger.info(f"Received signal {sig_name}, initiating graceful shutdown...")
-    shutdown_requested = True
+    shutdown_event.set()
 
 # Register signal handlers
 signal.signal(signal.SIGTERM, signal_handler)
@@ -158,6 +188,11 @@ def check_ollama_health() -> bool:
         response = requests.get(health_url, timeout=5)
         response.raise_for_status()
         
+        # Fast path: configured model appears in the raw body, skip JSON parsing
+        if f'"{OLLAMA_MODEL}"'.encode() in response.content:
+            logger.info(f"Ollama is healthy. Model '{OLLAMA_MODEL}' is available")
+            return True
+        
         # Check if the configured model is available
         data = response.json()
         models = [m.get('name', '') for m in data.get('models', [])]
@@ -222,7 +257,8 @@ def perform_startup_health_checks() -> bool:
     return all_checks_passed
 
 # ------- Retry Logic -------
-def create_retry_session(retries: int = MAX_RETRIES, backoff: float = RETRY_BACKOFF) -> requests.Session:
+def create_retry_session(retries: int = MAX_RETRIES, backoff: float = RETRY_BACKOFF,
+                         pool_maxsize: int = LLM_MAX_CONN) -> requests.Session:
     """Create a requests session with retry logic."""
     session = requests.Session()
     retry_strategy = Retry(
@@ -231,15 +267,89 @@ def create_retry_session(retries: int = MAX_RETRIES, backoff: float = RETRY_BACK
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["HEAD", "GET", "POST", "PUT", "DELETE", "OPTIONS", "TRACE"]
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_maxsize,
+                          pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
+# Shared LLM session (lazy-initialized) so TCP/TLS connections are reused across calls
+_llm_session: Optional[requests.Session] = None
+
+def get_llm_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for LLM requests."""
+    global _llm_session
+    if _llm_session is None:
+        _llm_session = create_retry_session()
+    return _llm_session
+
+def close_llm_session():
+    """Close pooled LLM connections (daemon shutdown)."""
+    global _llm_session
+    if _llm_session is not None:
+        _llm_session.close()
+        _llm_session = None
+
+# ------- Circuit Breaker -------
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures -> half-open after `cooldown`.
+    While open, callers are told to skip the request instead of waiting out timeouts.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Return True if a request may be attempted now."""
+        if not self.opened_at:
+            return True
+        if time.time() - self.opened_at >= self.cooldown:
+            # Half-open: let one probe through; the next cooldown starts now
+            self.opened_at = time.time()
+            logger.info("LLM circuit half-open, probing endpoint")
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at:
+            logger.info("LLM endpoint recovered, closing circuit")
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if not self.opened_at:
+                logger.warning(
+                    f"LLM failed {self.failures} times in a row, "
+                    f"skipping LLM calls for {self.cooldown:.0f}s"
+                )
+            self.opened_at = time.time()
+
+llm_breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+
 # ------- Gmail API -------
-def gmail_service(skip_auth_flow: bool = False) -> Any:
+def refresh_gmail_credentials(creds) -> None:
+    """Refresh an expired Gmail token in place and save it to token.json."""
+    token_path = Path(CREDENTIALS_PATH) / 'token.json'
+    logger.info("Refreshing expired Gmail token...")
+    try:
+        creds.refresh(Request())
+        logger.info("Token refreshed successfully")
+        # Save refreshed token
+        with open(token_path, 'w') as token:
+            token.write(creds.to_json())
+    except Exception as e:
+        logger.error(f"Failed to refresh token: {e}")
+        raise
+
+def load_gmail_credentials(skip_auth_flow: bool = False) -> Any:
     """
-    Initialize and return Gmail API service.
+    Load Gmail OAuth credentials from token.json, refreshing or running the OAuth flow as needed.
     
     Args:
         skip_auth_flow: If True, don't attempt OAuth flow. Just raise exception if no valid token.
@@ -255,16 +365,7 @@ def gmail_service(skip_auth_flow: bool = False) -> Any:
     
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            logger.info("Refreshing expired Gmail token...")
-            try:
-                creds.refresh(Request())
-                logger.info("Token refreshed successfully")
-                # Save refreshed token
-                with open(token_path, 'w') as token:
-                    token.write(creds.to_json())
-            except Exception as e:
-                logger.error(f"Failed to refresh token: {e}")
-                raise
+            refresh_gmail_credentials(creds)
         else:
             if not creds_path.exists():
                 logger.error(f"credentials.json not found at {creds_path}")
@@ -322,7 +423,23 @@ def gmail_service(skip_auth_flow: bool = False) -> Any:
                 token.write(creds.to_json())
             logger.debug(f"Token saved to {token_path}")
     
-    return build('gmail', 'v1', credentials=creds)
+    return creds
+
+def gmail_service(skip_auth_flow: bool = False, creds: Any = None) -> Any:
+    """
+    Initialize and return Gmail API service.
+    
+    Args:
+        skip_auth_flow: See load_gmail_credentials. Ignored when creds is given.
+        creds: Already-loaded credentials to build the service with.
+    """
+    if creds is None:
+        creds = load_gmail_credentials(skip_auth_flow)
+    # Use the bundled discovery document: no discovery fetch, no file cache
+    return build('gmail', 'v1', credentials=creds, cache_discovery=False, static_discovery=True)
+
+# Gmail allows up to 100 calls per batch request; 50 is the recommended size
+GMAIL_BATCH_SIZE = 50
 
 def list_threads(svc, query: str, max_results: int):
     resp = svc.users().threads().list(userId='me', q=query, maxResults=max_results).execute()
@@ -331,6 +448,26 @@ def list_threads(svc, query: str, max_results: int):
 def get_thread(svc, thread_id: str):
     return svc.users().threads().get(userId='me', id=thread_id, format='full').execute()
 
+def get_threads_batch(svc, thread_ids, fmt: str = 'full') -> Dict[str, Any]:
+    """
+    Fetch many threads with batched threads.get calls.
+
+    With fmt='metadata' only the METADATA_HEADERS are returned (no MIME
+    bodies). Returns {thread_id: thread dict, or the HttpError for that call}.
+    """
+    results = {}
+
+    def on_response(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    extra = {'metadataHeaders': METADATA_HEADERS} if fmt == 'metadata' else {}
+    for start in range(0, len(thread_ids), GMAIL_BATCH_SIZE):
+        batch = svc.new_batch_http_request(callback=on_response)
+        for tid in thread_ids[start:start + GMAIL_BATCH_SIZE]:
+            batch.add(svc.users().threads().get(userId='me', id=tid, format=fmt, **extra), request_id=tid)
+        batch.execute()
+    return results
+
 def get_subject_and_from(headers) -> Tuple[str, str]:
     subject, from_ = "", ""
     for h in headers:
@@ -341,20 +478,71 @@ def get_subject_and_from(headers) -> Tuple[str, str]:
             from_ = h.get('value', '')
     return subject, from_
 
+def get_header(headers, wanted: str) -> str:
+    wanted = wanted.lower()
+    for h in headers:
+        if h.get('name', '').lower() == wanted:
+            return h.get('value', '')
+    return ""
+
 def strip_html(html: str) -> str:
     html = re.sub(r'(?is)<(script|style).*?>.*?</\1>', ' ', html)
     html = re.sub(r'(?s)<.*?>', ' ', html)
     html = re.sub(r'\s+', ' ', html).strip()
     return html
 
-def decode_part(data: Optional[str]) -> str:
+def decode_part(data: Optional[str], max_bytes: int = MAX_PART_BYTES) -> str:
+    """
+    Decode a base64url MIME body, keeping at most max_bytes of output.
+    The encoded string is sliced first (4 chars -> 3 bytes) so multi-MB
+    newsletters are never fully decoded or HTML-stripped.
+    """
     if not data:
         return ""
+    if max_bytes and len(data) > (max_bytes + 2) // 3 * 4:
+        data = data[:(max_bytes + 2) // 3 * 4]
     try:
-        return base64.urlsafe_b64decode(data.encode('utf-8')).decode('utf-8', errors='ignore')
+        raw = base64.urlsafe_b64decode(data.encode('utf-8'))
+        if max_bytes:
+            raw = raw[:max_bytes]
+        return raw.decode('utf-8', errors='ignore')
     except Exception:
         return ""
 
+def _text_leaves(payload: Dict[str, Any]) -> Tuple[list, list]:
+    """
+    Walk the MIME tree iteratively (no recursion) and return the
+    (text/plain, text/html) leaf parts that carry body data, in document order.
+    Non-text parts (images, attachments, etc.) are skipped. Nothing is decoded.
+    """
+    plain_parts = []
+    html_parts = []
+    stack = [payload]
+
+    while stack:
+        part = stack.pop()
+        if not part:
+            continue
+
+        # Multipart container: queue text/multipart children in document order
+        if 'parts' in part:
+            children = []
+            for child in part['parts']:
+                child_mime = child.get('mimeType', '').lower()
+                if child_mime.startswith('text/') or child_mime.startswith('multipart/'):
+                    children.append(child)
+            stack.extend(reversed(children))
+            continue
+
+        if not part.get('body', {}).get('data'):
+            continue
+        if 'text/html' in part.get('mimeType', '').lower():
+            html_parts.append(part)
+        else:
+            plain_parts.append(part)
+
+    return plain_parts, html_parts
+
 def extract_text_from_payload(payload: Dict[str, Any]) -> str:
     """
     Extract plain text content from email payload.
@@ -369,60 +557,44 @@ def extract_text_from_payload(payload: Dict[str, Any]) -> str:
     """
     if not payload:
         return ""
-    
-    mime = payload.get('mimeType', '').lower()
-    body_data = payload.get('body', {}).get('data')
-    
-    # Handle multipart messages - prefer text/plain over text/html
-    if 'parts' in payload:
-        plain_texts = []
-        html_texts = []
-        
-        # Recursively collect text from all parts, separating plain and html
-        for part in payload['parts']:
-            part_mime = part.get('mimeType', '').lower()
-            
-            # Skip non-text parts (images, attachments, etc.)
-            if not part_mime.startswith('text/') and not part_mime.startswith('multipart/'):
+
+    plain_parts, html_parts = _text_leaves(payload)
+    for parts, is_html in ((plain_parts, False), (html_parts, True)):
+        texts = []
+        for part in parts:
+            text = decode_part(part['body']['data'])
+            if text:
+                texts.append(strip_html(text) if is_html else text)
+        if texts:
+            return "\n".join(texts)
+    return ""
+
+def payload_to_snippet(payload: Dict[str, Any], max_chars: int = 6000) -> str:
+    """
+    Single-pass equivalent of safe_snippet(extract_text_from_payload(payload), max_chars).
+
+    Each part is decoded, stripped and whitespace-normalized once, and the
+    walk stops as soon as max_chars of output exist, so later parts of large
+    newsletters are never decoded at all.
+    """
+    if not payload:
+        return ""
+
+    plain_parts, html_parts = _text_leaves(payload)
+    for parts, is_html in ((plain_parts, False), (html_parts, True)):
+        chunks = []
+        size = 0
+        for part in parts:
+            text = decode_part(part['body']['data'])
+            text = strip_html(text) if is_html else re.sub(r'\s+', ' ', text).strip()
+            if not text:
                 continue
-            
-            # Recursively process nested multipart structures
-            if 'parts' in part:
-                text = extract_text_from_payload(part)
-                if text:
-                    # Try to determine if this came from plain or html
-                    if 'text/plain' in part_mime or 'multipart/alternative' in part_mime:
-                        plain_texts.append(text)
-                    else:
-                        html_texts.append(text)
-            elif 'text/plain' in part_mime:
-                part_data = part.get('body', {}).get('data')
-                if part_data:
-                    plain_text = decode_part(part_data)
-                    if plain_text:
-                        plain_texts.append(plain_text)
-            elif 'text/html' in part_mime:
-                part_data = part.get('body', {}).get('data')
-                if part_data:
-                    html_text = decode_part(part_data)
-                    if html_text:
-                        html_texts.append(strip_html(html_text))
-        
-        # Prefer plain text over HTML
-        if plain_texts:
-            return "\n".join(plain_texts)
-        elif html_texts:
-            return "\n".join(html_texts)
-        else:
-            return ""
-    
-    # Handle single-part messages
-    if body_data:
-        text = decode_part(body_data)
-        if 'text/html' in mime:
-            text = strip_html(text)
-        return text
-    
+            chunks.append(text)
+            size += len(text) + 1
+            if size >= max_chars:
+                break
+        if chunks:
+            return " ".join(chunks)[:max_chars]
     return ""
 
 def safe_snippet(text: str, max_chars: int = 6000) -> str:
@@ -501,7 +673,7 @@ def call_openai_classifier(subject: str, body: str, sender: str, verbose: bool =
         ]
     }
     
-    session = create_retry_session()
+    session = get_llm_session()
     start_time = time.time()
     
     try:
@@ -550,16 +722,18 @@ def call_ollama_classifier(subject: str, body: str, sender: str, verbose: bool =
     logger.debug(f"Calling Ollama classifier for subject: {subject[:50]}...")
     start_time = time.time()
     
+    # stream=False makes Ollama return a single OpenAI-shaped JSON object
     payload = {
         "model": OLLAMA_MODEL,
         "messages": [
             {"role":"system","content": PROMPT_RULES},
             {"role":"user","content": f"From: {sender}\nSubject: {subject}\nBody: {body}"}
         ],
-        "temperature": 0
+        "temperature": 0,
+        "stream": False
     }
     
-    session = create_retry_session()
+    session = get_llm_session()
     
     try:
         r = session.post(OLLAMA_URL, json=payload, timeout=TIMEOUT_SEC)
@@ -568,169 +742,52 @@ def call_ollama_classifier(subject: str, body: str, sender: str, verbose: bool =
         logger.error(f"Ollama API request failed: {e}")
         raise
     
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    
+    elapsed_time = time.time() - start_time
     logger.debug(f"Ollama response received in {elapsed_time:.2f}s")
-    if verbose:
-        logger.debug(f"Ollama HTTP status: {r.status_code}")
-        logger.debug(f"Ollama response headers: {dict(r.headers)}")
-    
-    # Handle streaming NDJSON response from Ollama
-    if r.headers.get('Content-Type') == 'application/x-ndjson':
-        # Parse streaming response line by line
-        content = ""
-        final_content = ""
-        total_tokens = 0
-        prompt_tokens = 0
-        completion_tokens = 0
-        first_token_time = None
-        
-        for line in r.text.strip().split('\n'):
-            if not line.strip():
-                continue
-            try:
-                chunk = json.loads(line)
-                if chunk.get('done', False):
-                    # Final chunk, extract the complete content and token count
-                    if 'message' in chunk and 'content' in chunk['message']:
-                        final_content = chunk['message']['content']
-                    # Extract token count if available
-                    if 'usage' in chunk:
-                        total_tokens = chunk['usage'].get('total_tokens', 0)
-                        prompt_tokens = chunk['usage'].get('prompt_tokens', 0)
-                        completion_tokens = chunk['usage'].get('completion_tokens', 0)
-                    break
-                elif 'message' in chunk and 'content' in chunk['message']:
-                    # Track time to first token
-                    if first_token_time is None:
-                        first_token_time = time.time()
-                    # Accumulate content from streaming chunks
-                    chunk_content = chunk['message']['content']
-                    if chunk_content:  # Only add non-empty content
-                        content += chunk_content
-            except json.JSONDecodeError:
-                continue
-        
-        # Use final_content if available, otherwise use accumulated content
-        if final_content:
-            content = final_content
-            if verbose:
-                logger.debug(f"Using final_content: {repr(final_content)}")
-        elif not content:
-            # If no content was found, try to extract from the last chunk
-            lines = r.text.strip().split('\n')
-            if lines:
-                try:
-                    last_chunk = json.loads(lines[-1])
-                    if 'message' in last_chunk and 'content' in last_chunk['message']:
-                        content = last_chunk['message']['content']
-                        if verbose:
-                            logger.debug(f"Using last chunk content: {repr(content)}")
-                except json.JSONDecodeError:
-                    pass
-        
-        # Log performance metrics
-        metrics = log_performance_metrics(
-            provider="Ollama (streaming)",
-            elapsed_time=elapsed_time,
-            total_tokens=total_tokens,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            verbose=verbose
-        )
-        
-        if verbose and first_token_time:
-            time_to_first_token = first_token_time - start_time
-            logger.info(f"  Time to first token: {time_to_first_token:.3f}s")
-        
-        if verbose:
-            logger.debug(f"Final extracted content: {repr(content)}")
-            logger.debug(f"Content length: {len(content)}")
-        
-        if content:
-            try:
-                result = json.loads(content)
-                if verbose:
-                    result['_metrics'] = metrics
-                return result
-            except json.JSONDecodeError as e:
-                if verbose:
-                    logger.debug(f"JSON parse error: {e}")
-                # Try to extract JSON from content that might have extra text
-                if "Extra data" in str(e):
-                    # Look for JSON content between curly braces
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        try:
-                            json_content = json_match.group(0)
-                            if verbose:
-                                logger.debug(f"Extracted JSON: {json_content}")
-                            return json.loads(json_content)
-                        except json.JSONDecodeError:
-                            pass
-                # If JSON parsing fails, try fallback extraction
-                logger.warning(f"Failed to parse JSON from Ollama, using fallback extraction")
-                return extract_category_fallback(content)
-    
-    # Fallback to regular JSON parsing for non-streaming responses
+    
     try:
         j = r.json()
-    except json.JSONDecodeError as e:
-        logger.error(f"Ollama API returned malformed JSON: {e}")
+        content = j["choices"][0]["message"]["content"] or ""
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        logger.error(f"Ollama API returned malformed response: {e}")
         if verbose:
             logger.debug(f"Raw response text: {repr(r.text)}")
         return {"category": "none", "reason": "api_json_error", "confidence": 0.0}
     
-    # Chat Completions API returns the same structure as OpenAI
-    if "choices" in j and len(j["choices"]) > 0:
-        content = j["choices"][0].get("message", {}).get("content", "")
-        
-        # Extract token usage if available
-        usage = j.get("usage", {})
-        total_tokens = usage.get("total_tokens", 0)
-        prompt_tokens = usage.get("prompt_tokens", 0)
-        completion_tokens = usage.get("completion_tokens", 0)
-        
-        # Log performance metrics for non-streaming response
-        metrics = log_performance_metrics(
-            provider="Ollama (non-streaming)",
-            elapsed_time=elapsed_time,
-            total_tokens=total_tokens,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            verbose=verbose
-        )
-        
-        if content:
-            if verbose:
-                logger.debug(f"Raw Ollama response: {repr(content)}")
+    if not content:
+        logger.warning("Ollama returned empty response")
+        return {"category": "none", "reason": "empty_response", "confidence": 0.0}
+    
+    # Extract token usage if available
+    usage = j.get("usage", {})
+    metrics = log_performance_metrics(
+        provider="Ollama",
+        elapsed_time=elapsed_time,
+        total_tokens=usage.get("total_tokens", 0),
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        verbose=verbose
+    )
+    
+    if verbose:
+        logger.debug(f"Raw Ollama response: {repr(content)}")
+    try:
+        result = json.loads(content)
+        if verbose:
+            result['_metrics'] = metrics
+        return result
+    except json.JSONDecodeError as e:
+        if verbose:
+            logger.debug(f"JSON parse error: {e}")
+        # Local models sometimes wrap the JSON object in extra text
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if json_match:
             try:
-                result = json.loads(content)
-                if verbose:
-                    result['_metrics'] = metrics
-                return result
-            except json.JSONDecodeError as e:
-                if verbose:
-                    logger.debug(f"JSON parse error: {e}")
-                # Try to extract JSON from content that might have extra text
-                if "Extra data" in str(e):
-                    # Look for JSON content between curly braces
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        try:
-                            json_content = json_match.group(0)
-                            if verbose:
-                                logger.debug(f"Extracted JSON: {json_content}")
-                            return json.loads(json_content)
-                        except json.JSONDecodeError:
-                            pass
-                # If JSON parsing fails, try fallback extraction
-                logger.warning(f"Failed to parse JSON from Ollama, using fallback extraction")
-                return extract_category_fallback(content)
-    
-    logger.warning("Ollama returned empty response")
-    return {"category": "none", "reason": "empty_response", "confidence": 0.0}
+                return json.loads(json_match.group(0))
+            except json.JSONDecodeError:
+                pass
+        logger.warning(f"Failed to parse JSON from Ollama, using fallback extraction")
+        return extract_category_fallback(content)
 
 def extract_category_fallback(content: str) -> Dict[str, Any]:
     """Fallback method to extract category when JSON parsing fails"""
@@ -862,6 +919,8 @@ def call_llm_classifier_dspy(subject: str, body: str, sender: str, verbose: bool
             "_error": str(e)
         }
 
+LLM_UNAVAILABLE_REASON = "llm_unavailable"
+
 def call_llm_classifier(subject: str, body: str, sender: str, verbose: bool = False) -> Dict[str, Any]:
     """Main entry point for LLM classification.
     
@@ -874,7 +933,8 @@ def call_llm_classifier(subject: str, body: str, sender: str, verbose: bool = Fa
         verbose: If True, log detailed information
         
     Returns:
-        Dict with keys: category, reason, confidence
+        Dict with keys: category, reason, confidence. While the LLM circuit
+        breaker is open, reason is LLM_UNAVAILABLE_REASON and nothing is sent.
     """
     # Route to DSPy if enabled
     if USE_DSPY:
@@ -884,12 +944,27 @@ def call_llm_classifier(subject: str, body: str, sender: str, verbose: bool = Fa
             return call_llm_classifier_dspy(subject, body, sender, verbose)
     
     # Legacy implementation
+    if not llm_breaker.allow():
+        return {"category": "none", "reason": LLM_UNAVAILABLE_REASON, "confidence": 0.0}
+    
     provider = LLM_PROVIDER
-    if provider == "ollama":
-        return call_ollama_classifier(subject, body, sender, verbose)
-    return call_openai_classifier(subject, body, sender, verbose)
+    try:
+        if provider == "ollama":
+            result = call_ollama_classifier(subject, body, sender, verbose)
+        else:
+            result = call_openai_classifier(subject, body, sender, verbose)
+    except requests.RequestException:
+        llm_breaker.record_failure()
+        raise
+    llm_breaker.record_success()
+    return result
+
+# Label name -> ID, resolved once and reused for the lifetime of the process
+_labels_cache: Dict[str, str] = {}
 
 def ensure_labels_map(svc, want_names):
+    if all(name in _labels_cache for name in want_names):
+        return _labels_cache
     existing = svc.users().labels().list(userId='me').execute().get('labels', [])
     id_by_name = {lab['name']: lab['id'] for lab in existing}
     for name in want_names:
@@ -897,11 +972,71 @@ def ensure_labels_map(svc, want_names):
             body = {"name": name, "labelListVisibility": "labelShow", "messageListVisibility": "show"}
             lab = svc.users().labels().create(userId='me', body=body).execute()
             id_by_name[name] = lab['id']
-    return id_by_name
+    _labels_cache.update(id_by_name)
+    return _labels_cache
 
-def label_thread(svc, thread_id: str, add_label_ids):
-    body = {"addLabelIds": add_label_ids, "removeLabelIds": []}
-    return svc.users().threads().modify(userId='me', id=thread_id, body=body).execute()
+def invalidate_labels_cache():
+    """Forget cached label IDs so the next run re-resolves them."""
+    _labels_cache.clear()
+
+def label_threads_batch(svc, pending) -> int:
+    """
+    Apply labels to many threads using batched threads.modify calls.
+
+    Args:
+        pending: list of (thread_id, add_label_ids) tuples
+
+    Calls rejected with 429 are retried (only those calls) with exponential
+    backoff, up to MAX_RETRIES times. Returns the number of threads that
+    could not be labelled.
+    """
+    failed = 0
+    for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+        todo = dict(pending[start:start + GMAIL_BATCH_SIZE])
+        attempt = 0
+        while todo:
+            retry = {}
+
+            def on_response(request_id, response, exception):
+                nonlocal failed
+                if exception is None:
+                    return
+                status = getattr(getattr(exception, 'resp', None), 'status', None)
+                if status == 429 and attempt < MAX_RETRIES:
+                    retry[request_id] = todo[request_id]
+                    return
+                logger.error(f"Failed to label thread {request_id}: {exception}")
+                if status == 404:
+                    # A cached label may have been deleted; re-resolve next run
+                    invalidate_labels_cache()
+                failed += 1
+
+            batch = svc.new_batch_http_request(callback=on_response)
+            for tid, add_ids in todo.items():
+                body = {"addLabelIds": add_ids, "removeLabelIds": []}
+                batch.add(svc.users().threads().modify(userId='me', id=tid, body=body), request_id=tid)
+            batch.execute()
+
+            if retry:
+                delay = RETRY_BACKOFF ** attempt
+                logger.warning(f"Rate limited on {len(retry)} label update(s), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            todo = retry
+            attempt += 1
+    return failed
+
+
+# Shared prompt service (lazy-initialized); it keeps one SQLite connection per thread
+_prompt_service = None
+_prompt_service_lock = threading.Lock()
+
+def get_prompt_service():
+    """Lazy-initialize the shared PromptService (used from the prefetch worker too)."""
+    global _prompt_service
+    with _prompt_service_lock:
+        if _prompt_service is None:
+            _prompt_service = PromptService(PROMPT_DB_PATH)
+    return _prompt_service
 
 
 def _apply_tier1_rules(sender: str, subject: str, snippet: str) -> Optional[Tuple[str, str, str]]:
@@ -913,7 +1048,7 @@ def _apply_tier1_rules(sender: str, subject: str, snippet: str) -> Optional[Tupl
     if not EMAIL_INDEX_AVAILABLE:
         return None
     try:
-        prompt_svc = PromptService(PROMPT_DB_PATH)
+        prompt_svc = get_prompt_service()
         sender_result = prompt_svc.get_priority_for_sender(sender)
         if sender_result:
             priority, rule_type = sender_result
@@ -924,6 +1059,64 @@ def _apply_tier1_rules(sender: str, subject: str, snippet: str) -> Optional[Tupl
         return None
 
 
+# Compiled (political, ecommerce) sender regexes, keyed by the credentials dir
+_sender_patterns: Optional[Tuple[str, Any, Any]] = None
+
+
+def _read_sender_file(path: Path) -> list:
+    """Read one pattern per line, ignoring blanks and # comments."""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return []
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def _compile_sender_re(builtin, extra) -> Any:
+    if not extra:
+        return builtin
+    alternation = "|".join(re.escape(p) for p in extra)
+    return re.compile(f"{builtin.pattern}|{alternation}", re.I)
+
+
+def get_sender_patterns() -> Tuple[Any, Any]:
+    """
+    Return the compiled political and ecommerce sender regexes.
+
+    Built-in patterns are extended with political_senders.txt and
+    ecommerce_senders.txt from CREDENTIALS_PATH, so users can grow the
+    LLM-free fast path from senders the LLM keeps labelling the same way.
+    Compiled once and rebuilt only if CREDENTIALS_PATH changes.
+    """
+    global _sender_patterns
+    if _sender_patterns is None or _sender_patterns[0] != CREDENTIALS_PATH:
+        base = Path(CREDENTIALS_PATH)
+        political = _compile_sender_re(POLITICAL_SENDER_RE, _read_sender_file(base / POLITICAL_SENDERS_FILE))
+        ecommerce = _compile_sender_re(ECOMMERCE_SENDER_RE, _read_sender_file(base / ECOMMERCE_SENDERS_FILE))
+        _sender_patterns = (CREDENTIALS_PATH, political, ecommerce)
+    return _sender_patterns[1], _sender_patterns[2]
+
+
+def heuristic_classify(sender: str, list_unsub: str = "") -> Optional[str]:
+    """
+    Classify bulk mail from headers alone (no body download, no LLM).
+    Matches the sender and the List-Unsubscribe hosts against known senders
+    (never the full URL, whose path and query can name anyone).
+    Returns 'political' or 'ecommerce' for obvious senders, None if ambiguous.
+    """
+    if not list_unsub:
+        return None
+    political_re, ecommerce_re = get_sender_patterns()
+    unsub_hosts = UNSUB_HOST_RE.findall(list_unsub)
+    if political_re.search(sender) or any(political_re.search(host) for host in unsub_hosts):
+        return "political"
+    if ecommerce_re.search(sender) or any(
+        ecommerce_re.search(f"@{host}") for host in unsub_hosts
+    ):
+        return "ecommerce"
+    return None
+
+
 def _check_transactional_keywords(subject: str, snippet: str) -> bool:
     """Check if email looks transactional from keywords (for priority boost)."""
     content = f"{subject} {snippet}".lower()
@@ -945,7 +1138,7 @@ def _persist_to_index(
 ):
     """Persist classified email to local index for dashboard."""
     index = EmailIndex(EMAIL_INDEX_PATH)
-    prompt_svc = PromptService(PROMPT_DB_PATH)
+    prompt_svc = get_prompt_service()
 
     # Priority: Tier 1 rules override category-based
     if category == "blocklist":
@@ -987,15 +1180,90 @@ def _persist_to_index(
     )
 
 
-def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbose=False, daemon_mode=False) -> int:
+def fetch_chunk(svc, thread_ids) -> Dict[str, Any]:
+    """
+    Fetch and pre-filter one chunk of threads.
+
+    Headers are fetched for every thread; the full MIME tree only for threads
+    that neither tier-1 rules nor sender heuristics can classify.
+    Returns {thread_id: dict with message/subject/sender/text/tier1/heuristic,
+    None if the thread has no messages, or the HttpError for that thread}.
+    """
+    # Up to 2000 chars are kept as dashboard body text
+    text_max = max(TIER2_SNIPPET_MAX, 2000)
+    fetched = {}
+    need_full = []
+    for tid, th in get_threads_batch(svc, thread_ids, fmt='metadata').items():
+        if isinstance(th, Exception) or not th.get('messages'):
+            fetched[tid] = th if isinstance(th, Exception) else None
+            continue
+
+        first = th['messages'][0]
+        headers = first.get('payload', {}).get('headers', [])
+        subject, sender = get_subject_and_from(headers)
+
+        # Tier 1: Check if we can skip LLM (blocklist)
+        tier1_result = _apply_tier1_rules(sender, subject, "")
+        heuristic_category = None
+        if not tier1_result:
+            heuristic_category = heuristic_classify(
+                sender, get_header(headers, 'List-Unsubscribe')
+            )
+
+        text = ""
+        if tier1_result or heuristic_category:
+            # Gmail's own preview is enough for the dashboard
+            text = safe_snippet(unescape(first.get('snippet', '')), text_max)
+        else:
+            need_full.append(tid)
+        fetched[tid] = {
+            "message": first, "subject": subject, "sender": sender, "text": text,
+            "tier1": tier1_result, "heuristic": heuristic_category,
+        }
+
+    if need_full:
+        for tid, th in get_threads_batch(svc, need_full, fmt='full').items():
+            if isinstance(th, Exception):
+                fetched[tid] = th
+                continue
+            entry = fetched[tid]
+            entry["message"] = th.get('messages', [entry["message"]])[0]
+            entry["text"] = payload_to_snippet(entry["message"].get('payload', {}), text_max)
+    return fetched
+
+
+def prefetch_threads(svc, thread_ids):
+    """
+    Yield (thread_id, fetch_chunk entry) in order, fetching the next chunk
+    in a background thread while the caller classifies the current one.
+
+    A single worker keeps the Gmail service on one thread at a time; the
+    caller must not use svc until the generator is exhausted or closed.
+    """
+    chunks = [thread_ids[i:i + PREFETCH_CHUNK] for i in range(0, len(thread_ids), PREFETCH_CHUNK)]
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(fetch_chunk, svc, chunks[0])
+        for k, chunk in enumerate(chunks):
+            try:
+                fetched = future.result()
+            except Exception as e:
+                fetched = {tid: e for tid in chunk}
+            if k + 1 < len(chunks):
+                future = pool.submit(fetch_chunk, svc, chunks[k + 1])
+            for tid in chunk:
+                yield tid, fetched.get(tid)
+
+def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbose=False,
+             daemon_mode=False, svc=None) -> int:
     """
     Run one iteration of email processing. Returns number of processed emails.
     
     Args:
         daemon_mode: If True, skip interactive OAuth and just report auth needed.
+        svc: Gmail service to reuse (daemon mode). Built from token.json if None.
     """
-    global shutdown_requested
-    
     logger.info(f"Starting email processing run (dry_run={dry_run}, max_results={max_results})")
     logger.debug(f"Query: {query}")
     
@@ -1010,13 +1278,14 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
         'latencies': []
     }
     
-    try:
-        svc = gmail_service(skip_auth_flow=daemon_mode)
-    except Exception as e:
-        logger.error(f"Failed to initialize Gmail service: {e}")
-        if daemon_mode and "not authorized" in str(e).lower():
-            logger.info("Waiting for Gmail authorization via web interface...")
-        return 0
+    if svc is None:
+        try:
+            svc = gmail_service(skip_auth_flow=daemon_mode)
+        except Exception as e:
+            logger.error(f"Failed to initialize Gmail service: {e}")
+            if daemon_mode and "not authorized" in str(e).lower():
+                logger.info("Waiting for Gmail authorization via web interface...")
+            return 0
     
     want_labels = [LABEL_ECOMMERCE, LABEL_POLITICAL, LABEL_TRIAGED]
     try:
@@ -1040,42 +1309,48 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
 
     processed = 0
     errors = 0
+    pending_labels = []  # (thread_id, add_label_ids), applied in one batch at the end
     
-    for idx, t in enumerate(threads, 1):
-        if shutdown_requested:
+    prefetched = prefetch_threads(svc, [t['id'] for t in threads])
+    for idx, (tid, fetched) in enumerate(prefetched, 1):
+        if shutdown_event.is_set():
             logger.info("Shutdown requested, stopping processing")
             break
         
-        tid = t['id']
         logger.debug(f"Processing thread {idx}/{len(threads)}: {tid}")
         
         try:
-            th = get_thread(svc, tid)
-            msgs = th.get('messages', [])
-            if not msgs:
+            if isinstance(fetched, Exception):
+                raise fetched
+            if fetched is None:
                 logger.debug(f"Thread {tid} has no messages, skipping")
                 continue
 
-            first = msgs[0]
-            payload = first.get('payload', {})
-            headers = payload.get('headers', [])
-            subject, sender = get_subject_and_from(headers)
-            text = extract_text_from_payload(payload) or ""
-            snippet = safe_snippet(text, TIER2_SNIPPET_MAX)
-            
+            first = fetched["message"]
+            subject, sender, text = fetched["subject"], fetched["sender"], fetched["text"]
+            tier1_result, heuristic_category = fetched["tier1"], fetched["heuristic"]
+            snippet = text[:TIER2_SNIPPET_MAX]
+
             if verbose:
                 logger.debug(f"Extracted text length: {len(text)} chars, snippet: {len(snippet)} chars")
 
-            # Tier 1: Check if we can skip LLM (blocklist)
-            tier1_result = _apply_tier1_rules(sender, subject, snippet)
             if tier1_result:
                 priority, category, reason = tier1_result
                 result = {"category": category, "reason": reason, "confidence": 0.9}
                 logger.info(f"[Tier1 skip] {priority}: {subject[:60]}... ({reason})")
+            elif heuristic_category:
+                reason = "Matched sender heuristic"
+                result = {"category": heuristic_category, "reason": reason, "confidence": 0.9}
+                logger.info(f"[Heuristic skip] {heuristic_category}: {subject[:60]}... ({sender[:50]})")
             else:
                 # Tier 2: Lightweight LLM (subject + snippet)
                 logger.debug(f"Classifying: '{subject[:60]}...' from {sender}")
                 result = call_llm_classifier(subject, snippet, sender, verbose)
+                if result.get("reason") == LLM_UNAVAILABLE_REASON:
+                    # Leave the thread untriaged so the next run retries it
+                    logger.debug(f"LLM unavailable, skipping thread {tid}")
+                    errors += 1
+                    continue
             
             # Collect performance metrics if available (stored in result metadata)
             if verbose and isinstance(result, dict) and '_metrics' in result:
@@ -1098,8 +1373,8 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
                         thread_id=tid,
                         sender=sender,
                         subject=subject,
-                        snippet=safe_snippet(text, 500),
-                        body_text=text[:2000] if text else "",
+                        snippet=text[:500],
+                        body_text=text[:2000],
                         received_at=first.get("internalDate"),
                         label_ids=first.get("labelIds", []),
                         category=category,
@@ -1122,14 +1397,7 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
                 logger.debug(log_msg)
 
             if not dry_run:
-                try:
-                    label_thread(svc, tid, add_ids)
-                    logger.debug(f"Applied labels to thread {tid}")
-                    time.sleep(SLEEP_SECONDS)
-                except HttpError as e:
-                    logger.error(f"Failed to label thread {tid}: {e}")
-                    errors += 1
-                    continue
+                pending_labels.append((tid, add_ids))
 
             processed += 1
             
@@ -1143,6 +1411,19 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
             logger.error(f"Unexpected error processing thread {tid}: {e}", exc_info=True)
             errors += 1
 
+    # Waits for any in-flight prefetch before svc is used again below
+    prefetched.close()
+
+    if pending_labels:
+        try:
+            failed = label_threads_batch(svc, pending_labels)
+        except HttpError as e:
+            logger.error(f"Failed to apply labels: {e}")
+            failed = len(pending_labels)
+        processed -= failed
+        errors += failed
+        logger.debug(f"Applied labels to {len(pending_labels) - failed} thread(s)")
+
     # Log aggregate performance statistics
     run_elapsed = time.time() - run_start_time
     logger.info(f"Processing complete. Processed: {processed}, Errors: {errors}")
@@ -1177,8 +1458,6 @@ def run_once(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, verbos
 def run_daemon(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY, 
                interval=DAEMON_INTERVAL, verbose=False):
     """Run in daemon mode, continuously processing emails at regular intervals."""
-    global shutdown_requested
-    
     logger.info("=" * 80)
     logger.info("Gmail Email Categorizer - Daemon Mode")
     logger.info("=" * 80)
@@ -1200,13 +1479,18 @@ def run_daemon(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY,
         logger.error("Startup health checks failed, exiting")
         sys.exit(1)
     
+    get_llm_session()
     logger.info("Daemon started successfully")
     logger.info(f"Press Ctrl+C to stop")
     
     run_count = 0
     total_processed = 0
+    last_log_cleanup = float("-inf")  # First idle run after startup prunes
+    # Gmail service is built once and reused; creds are refreshed only when expired
+    creds = None
+    svc = None
     
-    while not shutdown_requested:
+    while not shutdown_event.is_set():
         run_count += 1
         start_time = time.time()
         
@@ -1215,23 +1499,46 @@ def run_daemon(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY,
         logger.info(f"{'='*80}")
         
         try:
-            processed = run_once(
-                dry_run=dry_run,
-                max_results=max_results,
-                query=query,
-                verbose=verbose,
-                daemon_mode=True
-            )
+            if svc is None:
+                creds = load_gmail_credentials(skip_auth_flow=True)
+                svc = gmail_service(creds=creds)
+            elif creds.expired and creds.refresh_token:
+                refresh_gmail_credentials(creds)
+        except Exception as e:
+            logger.error(f"Failed to initialize Gmail service: {e}")
+            if "not authorized" in str(e).lower():
+                logger.info("Waiting for Gmail authorization via web interface...")
+            # Reload token.json next run (it may be replaced via the web interface)
+            creds = svc = None
+        
+        try:
+            processed = 0
+            if svc is not None:
+                processed = run_once(
+                    dry_run=dry_run,
+                    max_results=max_results,
+                    query=query,
+                    verbose=verbose,
+                    daemon_mode=True,
+                    svc=svc
+                )
             total_processed += processed
             
             elapsed = time.time() - start_time
             logger.info(f"Run #{run_count} completed in {elapsed:.1f}s")
             logger.info(f"Total emails processed since startup: {total_processed}")
             
+            # Prune old logs in an idle window so it never delays classification
+            if (processed == 0 and LOG_RETENTION_DAYS > 0 and PromptService is not None
+                    and time.monotonic() - last_log_cleanup >= LOG_CLEANUP_INTERVAL):
+                last_log_cleanup = time.monotonic()
+                get_prompt_service().clear_old_logs(LOG_RETENTION_DAYS)
+                logger.info(f"Cleared classification logs older than {LOG_RETENTION_DAYS} days")
+            
         except Exception as e:
             logger.error(f"Error in run #{run_count}: {e}", exc_info=True)
         
-        if shutdown_requested:
+        if shutdown_event.is_set():
             break
         
         # Calculate next run time
@@ -1239,13 +1546,11 @@ def run_daemon(dry_run=False, max_results=MAX_RESULTS, query=DEFAULT_QUERY,
         next_run_str = datetime.fromtimestamp(next_run).strftime('%Y-%m-%d %H:%M:%S')
         logger.info(f"Next run scheduled at {next_run_str} (in {interval}s)")
         
-        # Sleep with periodic checks for shutdown
-        sleep_interval = 5  # Check every 5 seconds
-        slept = 0
-        while slept < interval and not shutdown_requested:
-            time.sleep(min(sleep_interval, interval - slept))
-            slept += sleep_interval
+        # Sleep until the next run, waking immediately on shutdown
+        if shutdown_event.wait(timeout=interval):
+            break
     
+    close_llm_session()
     logger.info("=" * 80)
     logger.info("Daemon shutting down gracefully")
     logger.info(f"Total runs: {run_count}")
@@ -6,123 +6,489 @@ Handles prompt storage, retrieval, and testing.
 
 import sqlite3
 import json
-from datetime import datetime
+import re
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Tuple, Callable
 from contextlib import contextmanager
 
+# Optional: Aho-Corasick matching for sender rules (falls back to a regex gate)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
-class PromptService:
-    """Simple service for managing email classification prompts."""
+
+# Hot-path statements kept as module constants: identical SQL text is what
+# lets sqlite3's per-connection statement cache reuse the prepared statement
+_SQL_INSERT_LOG = """INSERT INTO classification_logs 
+   (prompt_id, category, confidence, processing_time)
+   VALUES (?, ?, ?, ?)"""
+
+_SQL_INSERT_TEST_RESULT = """INSERT INTO test_results 
+   (prompt_id, email_subject, email_from, predicted_category, 
+    confidence, reason, processing_time)
+   VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+_SQL_INSERT_EXAMPLE = """INSERT INTO few_shot_examples 
+   (email_id, sender, subject, body, category, confidence, verified, notes)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+# Prompt columns, in the order the SELECTs below return them
+_PROMPT_COLUMNS = ("id", "name", "content", "is_active", "created_at", "updated_at")
+_PROMPT_META_COLUMNS = ("id", "name", "updated_at")
+_PROMPT_COLUMN_LIST = ", ".join(_PROMPT_COLUMNS)
+
+_SQL_SELECT_ACTIVE_PROMPT = (
+    f"SELECT {_PROMPT_COLUMN_LIST} FROM prompts WHERE is_active = 1 LIMIT 1"
+)
+_SQL_SELECT_ACTIVE_PROMPT_META = (
+    f"SELECT {', '.join(_PROMPT_META_COLUMNS)} FROM prompts WHERE is_active = 1 LIMIT 1"
+)
+_SQL_SELECT_PROMPT_BY_ID = f"SELECT {_PROMPT_COLUMN_LIST} FROM prompts WHERE id = ?"
+
+# Schema DDL, run as one script per store on open (see _SQLiteStore._executescript)
+_SQL_EXAMPLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS few_shot_examples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email_id VARCHAR(255),
+    sender VARCHAR(255) NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT,
+    category VARCHAR(50) NOT NULL,
+    confidence FLOAT DEFAULT 1.0,
+    verified BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP,
+    use_count INTEGER DEFAULT 0,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_category ON few_shot_examples(category);
+CREATE INDEX IF NOT EXISTS idx_verified ON few_shot_examples(verified);
+"""
+
+_SQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id INTEGER,
+    test_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    email_subject TEXT,
+    email_from TEXT,
+    predicted_category VARCHAR(50),
+    confidence FLOAT,
+    reason TEXT,
+    processing_time FLOAT,
+    FOREIGN KEY (prompt_id) REFERENCES prompts(id)
+);
+CREATE TABLE IF NOT EXISTS classification_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id INTEGER,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    category VARCHAR(50),
+    confidence FLOAT,
+    processing_time FLOAT,
+    FOREIGN KEY (prompt_id) REFERENCES prompts(id)
+);
+CREATE TABLE IF NOT EXISTS sender_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pattern VARCHAR(255) NOT NULL,
+    priority VARCHAR(20) DEFAULT 'medium',
+    label VARCHAR(100),
+    rule_type VARCHAR(20) NOT NULL DEFAULT 'allowlist',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS priority_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category VARCHAR(100) NOT NULL UNIQUE,
+    default_priority VARCHAR(20) DEFAULT 'medium',
+    is_high_value BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+""" + _SQL_EXAMPLES_SCHEMA + """
+-- update_prompt upserts by name. Older databases may hold duplicate names;
+-- suffix all but the oldest with their id (a no-op once the index exists).
+UPDATE prompts SET name = name || ' (' || id || ')'
+WHERE id NOT IN (SELECT MIN(id) FROM prompts GROUP BY name);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_prompts_name ON prompts(name);
+
+CREATE INDEX IF NOT EXISTS idx_prompts_active ON prompts(id) WHERE is_active = 1;
+-- Covering index: get_statistics filters and aggregates without row lookups
+CREATE INDEX IF NOT EXISTS idx_logs_prompt_ts
+    ON classification_logs(prompt_id, timestamp, category, confidence, processing_time);
+-- Range deletes in clear_old_logs
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON classification_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_test_date ON test_results(test_date DESC);
+"""
+
+# Per-connection settings, applied once when a connection is opened
+# (journal_mode=WAL is persisted in the file by _SQLiteStore._prepare_file)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=1073741824",  # 1GB
+    "PRAGMA cache_size=-131072",  # 128MB
+)
+
+# Seconds before cached rows are re-read, so edits by other processes show up
+CACHE_TTL = 60
+
+# Page size for new databases (existing ones are rebuilt once on open)
+PAGE_SIZE = 8192
+
+# Seconds between background WAL checkpoints
+CHECKPOINT_INTERVAL = 30
+
+# Idle read-only connections kept for reuse; extras are closed when returned
+READER_POOL_SIZE = 4
+
+
+def _cutoff_timestamp(days: int) -> str:
+    """UTC timestamp N days ago, in SQLite's CURRENT_TIMESTAMP format."""
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _build_sender_matcher(patterns: List[str]) -> Callable[[str], Optional[int]]:
+    """Build a function returning the index of the first pattern contained in a string.
     
-    def __init__(self, db_path: str = "./data/prompts.db"):
+    "First" means lowest index, i.e. rule order, not position in the string.
+    """
+    if not patterns:
+        return lambda text: None
+    
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for idx, pattern in enumerate(patterns):
+            # Duplicates keep the earliest rule; "" can't be added and matches anything
+            if pattern and not automaton.exists(pattern):
+                automaton.add_word(pattern, idx)
+        has_words = len(automaton) > 0
+        if has_words:
+            automaton.make_automaton()
+        empty_idx = patterns.index("") if "" in patterns else None
+        
+        def match(text: str) -> Optional[int]:
+            best = empty_idx
+            if has_words:
+                for _, idx in automaton.iter(text):
+                    if best is None or idx < best:
+                        best = idx
+            return best
+        return match
+    
+    # One regex pass rejects non-matching senders; hits scan in rule order
+    gate = re.compile("|".join(map(re.escape, patterns)))
+    
+    def match(text: str) -> Optional[int]:
+        if not gate.search(text):
+            return None
+        return next(idx for idx, pattern in enumerate(patterns) if pattern in text)
+    return match
+
+
+def _rows_to_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    """Fetch all rows as dicts, reading the column names once per query."""
+    keys = [column[0] for column in cursor.description]
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+
+def _example_rank(example: Dict[str, Any]) -> Tuple:
+    """Sort key matching ORDER BY verified DESC, use_count ASC, confidence DESC."""
+    return (-(example["verified"] or 0), example["use_count"] or 0, -(example["confidence"] or 0))
+
+
+class _SQLiteStore:
+    """Connection management shared by the stores backed by prompts.db.
+    
+    One writer connection is shared by all threads and serialized by a lock;
+    reads check out a query_only connection from a small pool, so short-lived
+    threads don't each leave a connection behind.
+    """
+    
+    # Checkpoint the WAL from a background thread instead of inside COMMIT
+    _background_checkpoint = True
+    
+    def __init__(self, db_path: str):
         self.db_path = db_path
-        self._ensure_database()
+        self._writer: Optional[sqlite3.Connection] = None
+        # Reused by the hot INSERTs so they only rebind parameters
+        self._writer_cursor: Optional[sqlite3.Cursor] = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        # Background WAL checkpointer (started with the first connection)
+        self._checkpoint_stop = threading.Event()
+        self._checkpointer: Optional[threading.Thread] = None
+    
+    def _open_conn(self, query_only: bool = False) -> sqlite3.Connection:
+        """Open a connection with the per-connection PRAGMAs applied."""
+        # Autocommit mode: get_db manages transactions explicitly
+        conn = sqlite3.connect(
+            self.db_path, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if self._background_checkpoint:
+            # Checkpointing is left to _checkpoint_loop so no COMMIT stalls on it
+            conn.execute("PRAGMA wal_autocheckpoint=0")
+        if query_only:
+            conn.execute("PRAGMA query_only=1")
+        with self._conns_lock:
+            self._conns.append(conn)
+            if self._background_checkpoint:
+                self._start_checkpointer()
+        return conn
+    
+    def _get_writer(self) -> sqlite3.Connection:
+        """Return the shared writer connection; callers must hold _writer_lock."""
+        if self._writer is None:
+            self._writer = self._open_conn()
+            self._writer_cursor = self._writer.cursor()
+        return self._writer
+    
+    def _checkout_reader(self) -> sqlite3.Connection:
+        """Take an idle read-only connection from the pool, opening one if none is free."""
+        with self._conns_lock:
+            if self._idle_readers:
+                return self._idle_readers.pop()
+        return self._open_conn(query_only=True)
+    
+    def _return_reader(self, conn: sqlite3.Connection):
+        """Put a reader back in the pool, or close it if the pool is full."""
+        with self._conns_lock:
+            if conn not in self._conns:
+                return  # Closed by close() while checked out
+            if len(self._idle_readers) < READER_POOL_SIZE:
+                self._idle_readers.append(conn)
+                return
+            self._conns.remove(conn)
+        conn.close()
+    
+    def _start_checkpointer(self):
+        """Start the background checkpoint thread if it isn't running."""
+        if self.db_path == ":memory:":
+            return
+        if self._checkpointer is not None and self._checkpointer.is_alive():
+            return
+        self._checkpoint_stop.clear()
+        self._checkpointer = threading.Thread(
+            target=self._checkpoint_loop, name="prompt-db-checkpoint", daemon=True
+        )
+        self._checkpointer.start()
+    
+    def _checkpoint_loop(self):
+        """Checkpoint and truncate the WAL every CHECKPOINT_INTERVAL seconds."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout=5000")
+        try:
+            while not self._checkpoint_stop.wait(CHECKPOINT_INTERVAL):
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+                except sqlite3.Error:
+                    pass  # Busy or locked; retry on the next tick
+        finally:
+            conn.close()
     
+    @staticmethod
     @contextmanager
-    def get_db(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def _transaction(conn: sqlite3.Connection, immediate: bool = False):
+        """Run the enclosed statements in one transaction on conn.
+        
+        immediate=True takes the write lock at BEGIN, so a writer waits (up to
+        busy_timeout) for other processes up front instead of failing with
+        SQLITE_BUSY when a deferred transaction tries to upgrade.
+        """
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
         try:
-            yield conn
-            conn.commit()
+            yield
+            conn.execute("COMMIT")
         except Exception:
-            conn.rollback()
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
             raise
+    
+    def _executescript(self, script: str):
+        """Run a multi-statement script on the writer in one IMMEDIATE transaction.
+        
+        executescript commits any open transaction first, so this can't be
+        called from inside get_db.
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            try:
+                conn.executescript(f"BEGIN IMMEDIATE;\n{script}\nCOMMIT;")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+    
+    @contextmanager
+    def get_db(self, write: bool = False, row_factory=None, autocommit: bool = False):
+        """Context manager yielding a connection inside a transaction.
+        
+        Rows are plain tuples unless a row_factory (e.g. sqlite3.Row) is given.
+        autocommit=True skips BEGIN/COMMIT for single-statement writes, which
+        SQLite then commits on its own.
+        """
+        with self._connection(write, autocommit) as conn:
+            previous = conn.row_factory
+            conn.row_factory = row_factory
+            try:
+                yield conn
+            finally:
+                conn.row_factory = previous
+    
+    @contextmanager
+    def _connection(self, write: bool, autocommit: bool = False):
+        """Context manager yielding a connection inside a transaction.
+        
+        Writes go through the single writer connection, one thread at a time;
+        reads use a pooled query_only connection and never wait on them.
+        Nested calls join the outer transaction, so reads inside a write see
+        its uncommitted changes.
+        """
+        if getattr(self._local, "writing", False):
+            yield self._writer
+            return
+        
+        if write or self.db_path == ":memory:":
+            with self._writer_lock:
+                conn = self._get_writer()
+                self._local.writing = True
+                try:
+                    if autocommit:
+                        yield conn
+                    else:
+                        with self._transaction(conn, immediate=write):
+                            yield conn
+                finally:
+                    self._local.writing = False
+            return
+        
+        conn = getattr(self._local, "reader", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._checkout_reader()
+        self._local.reader = conn
+        try:
+            with self._transaction(conn):
+                yield conn
         finally:
-            conn.close()
+            self._local.reader = None
+            self._return_reader(conn)
     
-    def _ensure_database(self):
-        """Create database tables if they don't exist."""
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+    def close(self):
+        """Stop the checkpointer and close every connection opened by this service."""
+        self._checkpoint_stop.set()
+        if self._checkpointer is not None:
+            self._checkpointer.join()
+            self._checkpointer = None
+        with self._writer_lock, self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+            self._idle_readers.clear()
+            self._writer = None
+            self._writer_cursor = None
+        self._local = threading.local()
+    
+    def _prepare_file(self):
+        """Apply file-level settings (page size, auto_vacuum, WAL).
         
-        with self.get_db() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS prompts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name VARCHAR(255) NOT NULL,
-                    content TEXT NOT NULL,
-                    is_active BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS test_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    prompt_id INTEGER,
-                    test_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    email_subject TEXT,
-                    email_from TEXT,
-                    predicted_category VARCHAR(50),
-                    confidence FLOAT,
-                    reason TEXT,
-                    processing_time FLOAT,
-                    FOREIGN KEY (prompt_id) REFERENCES prompts(id)
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS classification_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    prompt_id INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    category VARCHAR(50),
-                    confidence FLOAT,
-                    processing_time FLOAT,
-                    FOREIGN KEY (prompt_id) REFERENCES prompts(id)
-                )
-            """)
+        These pragmas cannot run inside a transaction.
+        """
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._writer_lock:
+            self._apply_file_pragmas(self._get_writer())
+    
+    def _apply_file_pragmas(self, conn: sqlite3.Connection):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if page_size != PAGE_SIZE or auto_vacuum != 2:
+            # INCREMENTAL lets clear_old_logs hand freed pages back to the OS.
+            # Both settings only apply to a new file, so existing databases are
+            # rebuilt with one VACUUM (which can't change page_size in WAL mode).
+            try:
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                if conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+                    conn.execute("VACUUM")
+            except sqlite3.OperationalError:
+                pass  # Another process has the file open; retried on next start
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
 
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS sender_rules (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    pattern VARCHAR(255) NOT NULL,
-                    priority VARCHAR(20) DEFAULT 'medium',
-                    label VARCHAR(100),
-                    rule_type VARCHAR(20) NOT NULL DEFAULT 'allowlist',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
 
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS priority_config (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category VARCHAR(100) NOT NULL UNIQUE,
-                    default_priority VARCHAR(20) DEFAULT 'medium',
-                    is_high_value BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+class PromptService(_SQLiteStore):
+    """Simple service for managing email classification prompts."""
+    
+    def __init__(self, db_path: str = "./data/prompts.db"):
+        super().__init__(db_path)
+        # Active prompt cache as (expires_at, row); the version is bumped by
+        # update_prompt so a read racing with an update never caches the stale row
+        self._active_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._active_version = 0
+        self._active_lock = threading.Lock()
+        # category -> default_priority, dropped wholesale when it expires
+        self._priority_cache: Dict[str, str] = {}
+        self._priority_expires = 0.0
+        # Sender rules as (expires_at, rules, matcher), versioned like the prompt cache
+        self._rules_cache: Optional[Tuple[float, List[Tuple[str, str, str]], Callable]] = None
+        self._rules_version = 0
+        self._rules_lock = threading.Lock()
+        self._ensure_database()
+    
+    def _ensure_database(self):
+        """Create database tables if they don't exist."""
+        self._prepare_file()
+        self._executescript(_SQL_SCHEMA)
 
-            # Seed default priority config for known categories
-            cursor = conn.execute("SELECT COUNT(*) as count FROM priority_config")
-            if cursor.fetchone()["count"] == 0:
-                defaults = [
-                    ("receipts", "high", True),
-                    ("transactions", "high", True),
-                    ("personal", "high", True),
-                    ("critical", "high", True),
-                    ("political", "low", False),
-                    ("news", "low", False),
-                    ("marketing", "low", False),
-                    ("ecommerce", "low", False),
-                    ("blocklist", "low", False),
-                ]
-                conn.executemany(
-                    "INSERT INTO priority_config (category, default_priority, is_high_value) VALUES (?, ?, ?)",
-                    defaults,
-                )
+        with self.get_db(write=True) as conn:
+            # Gather planner statistics once so the schema indexes get used
+            cursor = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                conn.execute("ANALYZE")
 
-            # Create default prompt if none exists
-            cursor = conn.execute("SELECT COUNT(*) as count FROM prompts")
-            if cursor.fetchone()["count"] == 0:
-                self._create_default_prompt(conn)
+            # Seed default priority config for known categories; existing rows
+            # (including user edits) win over the defaults
+            defaults = [
+                ("receipts", "high", True),
+                ("transactions", "high", True),
+                ("personal", "high", True),
+                ("critical", "high", True),
+                ("political", "low", False),
+                ("news", "low", False),
+                ("marketing", "low", False),
+                ("ecommerce", "low", False),
+                ("blocklist", "low", False),
+            ]
+            conn.executemany(
+                "INSERT OR IGNORE INTO priority_config (category, default_priority, is_high_value) VALUES (?, ?, ?)",
+                defaults,
+            )
+
+            self._create_default_prompt(conn)
     
     def _create_default_prompt(self, conn):
-        """Create the default prompt from hardcoded PROMPT_RULES."""
+        """Create the default prompt from hardcoded PROMPT_RULES if no prompt exists."""
         default_prompt = """You are a strict email classifier. Classify an email into exactly ONE of two buckets:
 1) 'ecommerce' – marketing or campaign emails from stores/brands about sales, product launches, coupons, promotions, newsletters from retailers.
    Include brand newsletters, 'shop now', seasonal sales, product announcements, abandoned cart promos, discount codes.
@@ -134,61 +500,77 @@ Format: {"category": "ecommerce|political|none", "reason": "short explanation",
 Be conservative and only pick 'political' if clearly political."""
         
         conn.execute(
-            "INSERT INTO prompts (name, content, is_active) VALUES (?, ?, ?)",
+            """INSERT INTO prompts (name, content, is_active)
+               SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM prompts)""",
             ("Default Classifier", default_prompt, True)
         )
     
     def get_active_prompt(self) -> Optional[Dict[str, Any]]:
-        """Get the currently active prompt."""
+        """Get the currently active prompt (cached until update_prompt or CACHE_TTL)."""
+        cached = self._active_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return dict(cached[1])
+        
+        version = self._active_version
         with self.get_db() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM prompts WHERE is_active = 1 LIMIT 1"
-            )
-            row = cursor.fetchone()
-            if row:
-                return dict(row)
+            row = conn.execute(_SQL_SELECT_ACTIVE_PROMPT).fetchone()
+        if not row:
             return None
+        
+        prompt = dict(zip(_PROMPT_COLUMNS, row))
+        with self._active_lock:
+            if version == self._active_version:
+                self._active_cache = (time.monotonic() + CACHE_TTL, prompt)
+        return dict(prompt)
+    
+    def get_active_prompt_meta(self) -> Optional[Dict[str, Any]]:
+        """Get id, name and updated_at of the active prompt, without its content."""
+        cached = self._active_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return {key: cached[1][key] for key in _PROMPT_META_COLUMNS}
+        with self.get_db() as conn:
+            row = conn.execute(_SQL_SELECT_ACTIVE_PROMPT_META).fetchone()
+            return dict(zip(_PROMPT_META_COLUMNS, row)) if row else None
+    
+    def get_active_prompt_content(self) -> Optional[str]:
+        """Get the text of the active prompt."""
+        prompt = self.get_active_prompt()
+        return prompt["content"] if prompt else None
+    
+    def _invalidate_active_prompt(self):
+        """Drop the cached active prompt."""
+        with self._active_lock:
+            self._active_version += 1
+            self._active_cache = None
     
     def update_prompt(self, name: str, content: str) -> Dict[str, Any]:
         """Update the active prompt (or create if none exists)."""
-        with self.get_db() as conn:
+        with self.get_db(write=True) as conn:
             # Deactivate all prompts
             conn.execute("UPDATE prompts SET is_active = 0")
             
-            # Check if a prompt with this name exists
+            # Update the prompt with this name, or create it
             cursor = conn.execute(
-                "SELECT id FROM prompts WHERE name = ?", (name,)
+                """INSERT INTO prompts (name, content, is_active) VALUES (?, ?, 1)
+                   ON CONFLICT(name) DO UPDATE SET
+                       content = excluded.content,
+                       is_active = 1,
+                       updated_at = CURRENT_TIMESTAMP
+                   RETURNING """ + _PROMPT_COLUMN_LIST,
+                (name, content)
             )
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing
-                conn.execute(
-                    """UPDATE prompts 
-                       SET content = ?, is_active = 1, updated_at = CURRENT_TIMESTAMP
-                       WHERE id = ?""",
-                    (content, existing["id"])
-                )
-                prompt_id = existing["id"]
-            else:
-                # Create new
-                cursor = conn.execute(
-                    "INSERT INTO prompts (name, content, is_active) VALUES (?, ?, 1)",
-                    (name, content)
-                )
-                prompt_id = cursor.lastrowid
-            
-            return self.get_prompt_by_id(prompt_id)
+            prompt = dict(zip(_PROMPT_COLUMNS, cursor.fetchone()))
+        
+        # Only after COMMIT, so a concurrent reader cannot re-cache the old row
+        self._invalidate_active_prompt()
+        return prompt
     
     def get_prompt_by_id(self, prompt_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific prompt by ID."""
         with self.get_db() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM prompts WHERE id = ?", (prompt_id,)
-            )
-            row = cursor.fetchone()
+            row = conn.execute(_SQL_SELECT_PROMPT_BY_ID, (prompt_id,)).fetchone()
             if row:
-                return dict(row)
+                return dict(zip(_PROMPT_COLUMNS, row))
             return None
     
     def save_test_result(
@@ -202,12 +584,10 @@ Be conservative and only pick 'political' if clearly political."""
         processing_time: float
     ) -> int:
         """Save a test result."""
-        with self.get_db() as conn:
-            cursor = conn.execute(
-                """INSERT INTO test_results 
-                   (prompt_id, email_subject, email_from, predicted_category, 
-                    confidence, reason, processing_time)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        with self.get_db(write=True):
+            cursor = self._writer_cursor
+            cursor.execute(
+                _SQL_INSERT_TEST_RESULT,
                 (prompt_id, email_subject, email_from, category, confidence, 
                  reason, processing_time)
             )
@@ -216,12 +596,19 @@ Be conservative and only pick 'political' if clearly political."""
     def get_recent_test_results(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent test results."""
         with self.get_db() as conn:
+            # SQLite builds the whole list as one JSON document
             cursor = conn.execute(
-                """SELECT * FROM test_results 
-                   ORDER BY test_date DESC LIMIT ?""",
+                """SELECT json_group_array(json_object(
+                       'id', id, 'prompt_id', prompt_id, 'test_date', test_date,
+                       'email_subject', email_subject, 'email_from', email_from,
+                       'predicted_category', predicted_category, 'confidence', confidence,
+                       'reason', reason, 'processing_time', processing_time
+                   ))
+                   FROM (SELECT * FROM test_results 
+                         ORDER BY test_date DESC LIMIT ?)""",
                 (limit,)
             )
-            return [dict(row) for row in cursor.fetchall()]
+            return json.loads(cursor.fetchone()[0])
     
     def log_classification(
         self,
@@ -231,80 +618,74 @@ Be conservative and only pick 'political' if clearly political."""
         processing_time: float
     ):
         """Log a production classification."""
-        with self.get_db() as conn:
-            conn.execute(
-                """INSERT INTO classification_logs 
-                   (prompt_id, category, confidence, processing_time)
-                   VALUES (?, ?, ?, ?)""",
-                (prompt_id, category, confidence, processing_time)
-            )
+        self.log_classification_many([(prompt_id, category, confidence, processing_time)])
+    
+    def log_classification_many(self, rows: List[Tuple[int, str, float, float]]):
+        """Log many classifications in one transaction.
+        
+        Each row is (prompt_id, category, confidence, processing_time).
+        """
+        with self.get_db(write=True):
+            self._writer_cursor.executemany(_SQL_INSERT_LOG, rows)
     
     def get_statistics(self, days: int = 7) -> Dict[str, Any]:
         """Get classification statistics for the last N days."""
         with self.get_db() as conn:
             # Get active prompt
-            active = self.get_active_prompt()
+            active = self.get_active_prompt_meta()
             if not active:
                 return {"error": "No active prompt"}
+            cutoff = _cutoff_timestamp(days)
             
-            # Get counts by category
-            cursor = conn.execute(
-                """SELECT category, COUNT(*) as count, AVG(confidence) as avg_conf
-                   FROM classification_logs
-                   WHERE prompt_id = ?
-                   AND timestamp >= datetime('now', '-' || ? || ' days')
-                   GROUP BY category""",
-                (active["id"], days)
-            )
-            
-            categories = {}
-            total = 0
-            for row in cursor:
-                cat = row["category"]
-                count = row["count"]
-                categories[cat] = {
-                    "count": count,
-                    "avg_confidence": round(row["avg_conf"], 3) if row["avg_conf"] else 0
-                }
-                total += count
-            
-            # Get overall stats
-            cursor = conn.execute(
-                """SELECT 
-                     AVG(confidence) as avg_conf,
-                     AVG(processing_time) as avg_time
-                   FROM classification_logs
-                   WHERE prompt_id = ?
-                   AND timestamp >= datetime('now', '-' || ? || ' days')""",
-                (active["id"], days)
-            )
-            
-            overall = cursor.fetchone()
+            # One pass over the window. SQLite builds the categories object as
+            # JSON; the overall averages come from per-category sums and
+            # non-NULL counts, so they match AVG() over all rows.
+            categories_json, total, avg_conf, avg_time = conn.execute(
+                """SELECT json_group_object(category, json_object(
+                              'count', count, 'avg_confidence', avg_conf
+                          )),
+                          COALESCE(SUM(count), 0),
+                          COALESCE(ROUND(SUM(sum_conf) / SUM(n_conf), 3), 0),
+                          COALESCE(ROUND(SUM(sum_time) / SUM(n_time), 3), 0)
+                   FROM (
+                       SELECT COALESCE(category, 'none') as category, COUNT(*) as count,
+                              COALESCE(ROUND(AVG(confidence), 3), 0) as avg_conf,
+                              TOTAL(confidence) as sum_conf, COUNT(confidence) as n_conf,
+                              TOTAL(processing_time) as sum_time, COUNT(processing_time) as n_time
+                       FROM classification_logs
+                       WHERE prompt_id = ?
+                       AND timestamp >= ?
+                       GROUP BY 1
+                   )""",
+                (active["id"], cutoff)
+            ).fetchone()
             
             return {
                 "prompt_id": active["id"],
                 "prompt_name": active["name"],
                 "days": days,
                 "total_classifications": total,
-                "categories": categories,
-                "avg_confidence": round(overall["avg_conf"], 3) if overall["avg_conf"] else 0,
-                "avg_processing_time": round(overall["avg_time"], 3) if overall["avg_time"] else 0
+                "categories": json.loads(categories_json),
+                "avg_confidence": avg_conf,
+                "avg_processing_time": avg_time
             }
     
     def clear_old_logs(self, days: int = 30):
-        """Clear classification logs older than N days."""
-        with self.get_db() as conn:
-            conn.execute(
-                """DELETE FROM classification_logs 
-                   WHERE timestamp < datetime('now', '-' || ? || ' days')""",
-                (days,)
-            )
-            
-            conn.execute(
-                """DELETE FROM test_results 
-                   WHERE test_date < datetime('now', '-' || ? || ' days')""",
-                (days,)
-            )
+        """Clear classification logs and test results older than N days.
+        
+        Both deletes run as one index-range transaction; the WAL is then
+        truncated and the freed pages returned to the OS.
+        """
+        cutoff = _cutoff_timestamp(days)
+        with self.get_db(write=True) as conn:
+            conn.execute("DELETE FROM classification_logs WHERE timestamp < ?", (cutoff,))
+            conn.execute("DELETE FROM test_results WHERE test_date < ?", (cutoff,))
+        
+        with self._writer_lock:
+            conn = self._get_writer()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            # incremental_vacuum frees one page per result row; drain it to finish
+            conn.execute("PRAGMA incremental_vacuum(1000)").fetchall()
 
     # ---- Sender rules ----
 
@@ -314,7 +695,7 @@ Be conservative and only pick 'political' if clearly political."""
             cursor = conn.execute(
                 "SELECT * FROM sender_rules ORDER BY rule_type, pattern"
             )
-            return [dict(row) for row in cursor.fetchall()]
+            return _rows_to_dicts(cursor)
 
     def add_sender_rule(
         self,
@@ -324,33 +705,63 @@ Be conservative and only pick 'political' if clearly political."""
         rule_type: str = "allowlist",
     ) -> int:
         """Add a sender rule (allowlist or blocklist)."""
-        with self.get_db() as conn:
+        with self.get_db(write=True) as conn:
             cursor = conn.execute(
                 """INSERT INTO sender_rules (pattern, priority, label, rule_type)
                    VALUES (?, ?, ?, ?)""",
                 (pattern, priority, label, rule_type),
             )
-            return cursor.lastrowid
+            rule_id = cursor.lastrowid
+        self._invalidate_sender_rules()
+        return rule_id
 
     def delete_sender_rule(self, rule_id: int):
         """Delete a sender rule."""
-        with self.get_db() as conn:
+        with self.get_db(write=True, autocommit=True) as conn:
             conn.execute("DELETE FROM sender_rules WHERE id = ?", (rule_id,))
+        self._invalidate_sender_rules()
+
+    def _invalidate_sender_rules(self):
+        """Drop the cached sender rules and matcher."""
+        with self._rules_lock:
+            self._rules_version += 1
+            self._rules_cache = None
+
+    def _get_sender_matcher(self) -> Tuple[List[Tuple[str, str, str]], Callable]:
+        """Return (rules, matcher) with rules as (pattern, priority, rule_type) in id order."""
+        cached = self._rules_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+        
+        version = self._rules_version
+        with self.get_db() as conn:
+            rules = [
+                (pattern.lower(), priority, rule_type)
+                for pattern, priority, rule_type in conn.execute(
+                    "SELECT pattern, priority, rule_type FROM sender_rules ORDER BY id"
+                )
+            ]
+        matcher = _build_sender_matcher([rule[0] for rule in rules])
+        with self._rules_lock:
+            if version == self._rules_version:
+                self._rules_cache = (time.monotonic() + CACHE_TTL, rules, matcher)
+        return rules, matcher
 
     def get_priority_for_sender(self, sender: str) -> Optional[Tuple[str, str]]:
         """
         Check sender against rules. Returns (priority, rule_type) if matched.
         allowlist = high-value sender; blocklist = low-value.
         """
-        sender_lower = sender.lower()
-        with self.get_db() as conn:
-            for row in conn.execute("SELECT * FROM sender_rules ORDER BY id"):
-                pattern = row["pattern"].lower()
-                if pattern in sender_lower or pattern in sender_lower.split("@")[0]:
-                    if row["rule_type"] == "allowlist":
-                        return (row["priority"] or "high", "allowlist")
-                    return (row["priority"] or "low", "blocklist")
-        return None
+        rules, matcher = self._get_sender_matcher()
+        # The local part is a prefix of the address, so a pattern found in the
+        # local part is always found in the whole address too
+        idx = matcher(sender.lower())
+        if idx is None:
+            return None
+        _, priority, rule_type = rules[idx]
+        if rule_type == "allowlist":
+            return (priority or "high", "allowlist")
+        return (priority or "low", "blocklist")
 
     # ---- Priority config ----
 
@@ -360,17 +771,28 @@ Be conservative and only pick 'political' if clearly political."""
             cursor = conn.execute(
                 "SELECT * FROM priority_config ORDER BY is_high_value DESC, category"
             )
-            return [dict(row) for row in cursor.fetchall()]
+            return _rows_to_dicts(cursor)
 
     def get_priority_for_category(self, category: str) -> str:
-        """Get default priority for a category."""
+        """Get default priority for a category (cached for CACHE_TTL)."""
+        category = category.lower()
+        now = time.monotonic()
+        if now >= self._priority_expires:
+            self._priority_cache = {}
+            self._priority_expires = now + CACHE_TTL
+        priority = self._priority_cache.get(category)
+        if priority is not None:
+            return priority
+        
         with self.get_db() as conn:
             cursor = conn.execute(
                 "SELECT default_priority FROM priority_config WHERE category = ?",
-                (category.lower(),),
+                (category,),
             )
             row = cursor.fetchone()
-            return row["default_priority"] if row else "medium"
+        priority = row[0] if row else "medium"
+        self._priority_cache[category] = priority
+        return priority
 
     def update_priority_config(
         self,
@@ -379,7 +801,7 @@ Be conservative and only pick 'political' if clearly political."""
         is_high_value: bool = False,
     ):
         """Insert or update priority for a category."""
-        with self.get_db() as conn:
+        with self.get_db(write=True, autocommit=True) as conn:
             conn.execute(
                 """INSERT INTO priority_config (category, default_priority, is_high_value)
                    VALUES (?, ?, ?)
@@ -388,62 +810,46 @@ Be conservative and only pick 'political' if clearly political."""
                        is_high_value = excluded.is_high_value""",
                 (category.lower(), default_priority, is_high_value),
             )
+        self._priority_cache.pop(category.lower(), None)
 
 
-class ExampleStore:
+class ExampleStore(_SQLiteStore):
     """Store and retrieve few-shot examples for DSPy optimization.
     
     This class manages a collection of high-quality classification examples
     that can be used for few-shot learning and prompt optimization.
     """
     
-    def __init__(self, db_path: str = "./data/prompts.db"):
-        self.db_path = db_path
+    # Standalone instances are short-lived scripts; let COMMIT checkpoint
+    _background_checkpoint = False
+    
+    def __init__(
+        self,
+        db_path: str = "./data/prompts.db",
+        prompt_service: Optional[PromptService] = None,
+    ):
+        """Open the example store.
+        
+        With a prompt_service, its connections are reused and the table is
+        already created by its _ensure_database; db_path is then ignored.
+        """
+        if prompt_service is not None:
+            self.db_path = prompt_service.db_path
+            self._db: _SQLiteStore = prompt_service
+            return
+        super().__init__(db_path)
+        self._db = self
         self._ensure_examples_table()
     
-    @contextmanager
-    def get_db(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+    def close(self):
+        """Close this store's connections (a shared service is left open)."""
+        if self._db is self:
+            super().close()
     
     def _ensure_examples_table(self):
         """Create few_shot_examples table if it doesn't exist."""
-        with self.get_db() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS few_shot_examples (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email_id VARCHAR(255),
-                    sender VARCHAR(255) NOT NULL,
-                    subject TEXT NOT NULL,
-                    body TEXT,
-                    category VARCHAR(50) NOT NULL,
-                    confidence FLOAT DEFAULT 1.0,
-                    verified BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used_at TIMESTAMP,
-                    use_count INTEGER DEFAULT 0,
-                    notes TEXT
-                )
-            """)
-            
-            # Create indices for faster retrieval
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_category 
-                ON few_shot_examples(category)
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_verified 
-                ON few_shot_examples(verified)
-            """)
+        self._prepare_file()
+        self._executescript(_SQL_EXAMPLES_SCHEMA)
     
     def add_example(
         self,
@@ -471,11 +877,10 @@ class ExampleStore:
         Returns:
             ID of the inserted example
         """
-        with self.get_db() as conn:
-            cursor = conn.execute(
-                """INSERT INTO few_shot_examples 
-                   (email_id, sender, subject, body, category, confidence, verified, notes)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        with self._db.get_db(write=True):
+            cursor = self._db._writer_cursor
+            cursor.execute(
+                _SQL_INSERT_EXAMPLE,
                 (email_id, sender, subject, body, category, confidence, verified, notes)
             )
             return cursor.lastrowid
@@ -489,7 +894,7 @@ class ExampleStore:
         Returns:
             Example dict or None if not found
         """
-        with self.get_db() as conn:
+        with self._db.get_db(row_factory=sqlite3.Row) as conn:
             cursor = conn.execute(
                 "SELECT * FROM few_shot_examples WHERE id = ?",
                 (example_id,)
@@ -521,7 +926,7 @@ class ExampleStore:
         Returns:
             List of example dicts
         """
-        with self.get_db() as conn:
+        with self._db.get_db(write=True) as conn:
             conditions = ["confidence >= ?"]
             params = [min_confidence]
             
@@ -534,29 +939,26 @@ class ExampleStore:
             
             where_clause = " AND ".join(conditions)
             
-            # Order by: verified first, then by use_count (ascending) to balance usage
+            # Order by: verified first, then by use_count (ascending) to balance usage.
+            # Picking and bumping use counts is one statement.
             query = f"""
-                SELECT * FROM few_shot_examples
-                WHERE {where_clause}
-                ORDER BY verified DESC, use_count ASC, confidence DESC
-                LIMIT ?
+                WITH picked AS (
+                    SELECT id FROM few_shot_examples
+                    WHERE {where_clause}
+                    ORDER BY verified DESC, use_count ASC, confidence DESC
+                    LIMIT ?
+                )
+                UPDATE few_shot_examples
+                SET use_count = use_count + 1,
+                    last_used_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT id FROM picked)
+                RETURNING *
             """
             params.append(k)
             
             cursor = conn.execute(query, params)
-            examples = [dict(row) for row in cursor.fetchall()]
-            
-            # Update use counts
-            if examples:
-                example_ids = [ex['id'] for ex in examples]
-                placeholders = ','.join('?' * len(example_ids))
-                conn.execute(
-                    f"""UPDATE few_shot_examples 
-                        SET use_count = use_count + 1, 
-                            last_used_at = CURRENT_TIMESTAMP
-                        WHERE id IN ({placeholders})""",
-                    example_ids
-                )
+            # RETURNING order is unspecified; restore the selection order
+            examples = sorted(_rows_to_dicts(cursor), key=_example_rank)
             
             return examples
     
@@ -575,17 +977,32 @@ class ExampleStore:
             List of examples with balanced representation
         """
         categories = ['ecommerce', 'political', 'none']
-        all_examples = []
         
-        for category in categories:
-            examples = self.get_best_examples(
-                category=category,
-                k=k_per_category,
-                verified_only=verified_only
+        # Rank within each category (same order and confidence floor as
+        # get_best_examples) and bump use counts of the picks in one statement
+        with self._db.get_db(write=True) as conn:
+            cursor = conn.execute(
+                """WITH ranked AS (
+                       SELECT id, ROW_NUMBER() OVER (
+                           PARTITION BY category
+                           ORDER BY verified DESC, use_count ASC, confidence DESC
+                       ) AS rn
+                       FROM few_shot_examples
+                       WHERE confidence >= 0.8
+                       AND (? = 0 OR verified = 1)
+                       AND category IN (?, ?, ?)
+                   )
+                   UPDATE few_shot_examples
+                   SET use_count = use_count + 1,
+                       last_used_at = CURRENT_TIMESTAMP
+                   WHERE id IN (SELECT id FROM ranked WHERE rn <= ?)
+                   RETURNING *""",
+                (int(verified_only), *categories, k_per_category)
             )
-            all_examples.extend(examples)
+            examples = _rows_to_dicts(cursor)
         
-        return all_examples
+        # Grouped by category in the order above, best first within each
+        return sorted(examples, key=lambda ex: (categories.index(ex['category']), _example_rank(ex)))
     
     def mark_verified(self, example_id: int, verified: bool = True):
         """Mark an example as verified (or unverified).
@@ -594,7 +1011,7 @@ class ExampleStore:
             example_id: Example ID
             verified: Verification status
         """
-        with self.get_db() as conn:
+        with self._db.get_db(write=True, autocommit=True) as conn:
             conn.execute(
                 "UPDATE few_shot_examples SET verified = ? WHERE id = ?",
                 (verified, example_id)
@@ -606,7 +1023,7 @@ class ExampleStore:
         Args:
             example_id: Example ID
         """
-        with self.get_db() as conn:
+        with self._db.get_db(write=True, autocommit=True) as conn:
             conn.execute(
                 "DELETE FROM few_shot_examples WHERE id = ?",
                 (example_id,)
@@ -626,7 +1043,7 @@ class ExampleStore:
         Returns:
             List of example dicts
         """
-        with self.get_db() as conn:
+        with self._db.get_db() as conn:
             query = """
                 SELECT * FROM few_shot_examples
                 ORDER BY created_at DESC
@@ -636,7 +1053,7 @@ class ExampleStore:
                 query += f" LIMIT {limit} OFFSET {offset}"
             
             cursor = conn.execute(query)
-            return [dict(row) for row in cursor.fetchall()]
+            return _rows_to_dicts(cursor)
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get statistics about the example store.
@@ -644,7 +1061,7 @@ class ExampleStore:
         Returns:
             Dict with statistics
         """
-        with self.get_db() as conn:
+        with self._db.get_db(row_factory=sqlite3.Row) as conn:
             # Total examples
             total = conn.execute(
                 "SELECT COUNT(*) as count FROM few_shot_examples"
@@ -690,7 +1107,7 @@ def main():
     
     # Test ExampleStore
     print("\n--- Testing ExampleStore ---")
-    example_store = ExampleStore("./data/prompts.db")
+    example_store = ExampleStore(prompt_service=service)
     
     # Add a test example
     example_id = example_store.add_example(
@@ -6,55 +6,64 @@ Returns exit code 0 if healthy, non-zero if unhealthy.
 
 import sys
 import os
-from pathlib import Path
+import importlib.util
 
-def check_credentials():
+REQUIRED_MODULES = [
+    'googleapiclient',
+    'google.auth',
+    'requests',
+]
+
+def module_installed(module):
+    """Check that a module is installed without importing it."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+def check_credentials(env):
     """Check if credentials files exist."""
-    creds_path = os.getenv('CREDENTIALS_PATH', '/app/data')
+    creds_path = env.get('CREDENTIALS_PATH', '/app/data')
     
-    credentials_file = Path(creds_path) / 'credentials.json'
-    token_file = Path(creds_path) / 'token.json'
+    credentials_file = f"{creds_path}/credentials.json"
+    token_file = f"{creds_path}/token.json"
     
-    if not credentials_file.exists():
+    if not os.path.isfile(credentials_file):
         print(f"ERROR: credentials.json not found at {credentials_file}", file=sys.stderr)
         return False
     
-    if not token_file.exists():
+    if not os.path.isfile(token_file):
         print(f"WARNING: token.json not found at {token_file}", file=sys.stderr)
         print("This is expected on first run before OAuth", file=sys.stderr)
     
     return True
 
-def check_imports():
-    """Check if required Python modules can be imported."""
-    required_modules = [
-        'googleapiclient',
-        'google.auth',
-        'requests',
-    ]
+def check_imports(env):
+    """Check if required Python modules are installed (without importing them).
     
-    for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError as e:
-            print(f"ERROR: Failed to import {module}: {e}", file=sys.stderr)
+    Also run at image build time (`healthcheck.py --check-imports`), so a
+    missing module fails the build rather than the first health check.
+    """
+    for module in REQUIRED_MODULES:
+        if not module_installed(module):
+            print(f"ERROR: Module {module} not installed", file=sys.stderr)
             return False
     
     return True
 
-def check_environment():
+def check_environment(env):
     """Check if required environment variables are set."""
     required_vars = ['LLM_PROVIDER']
     
     for var in required_vars:
-        if not os.getenv(var):
+        if not env.get(var):
             print(f"ERROR: Required environment variable {var} not set", file=sys.stderr)
             return False
     
-    provider = os.getenv('LLM_PROVIDER', '').lower()
+    provider = env.get('LLM_PROVIDER', '').lower()
     
     if provider == 'openai':
-        if not os.getenv('OPENAI_API_KEY'):
+        if not env.get('OPENAI_API_KEY'):
             print("ERROR: OPENAI_API_KEY not set but LLM_PROVIDER=openai", file=sys.stderr)
             return False
     elif provider == 'ollama':
@@ -68,6 +77,10 @@ def check_environment():
 
 def main():
     """Run all health checks."""
+    env = os.environ
+    if sys.argv[1:] == ['--check-imports']:
+        sys.exit(0 if check_imports(env) else 1)
+    
     checks = [
         ("Python imports", check_imports),
         ("Environment variables", check_environment),
@@ -78,7 +91,7 @@ def main():
     
     for check_name, check_func in checks:
         try:
-            if not check_func():
+            if not check_func(env):
                 print(f"FAILED: {check_name}", file=sys.stderr)
                 all_passed = False
         except Exception as e:
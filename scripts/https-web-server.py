@@ -3,51 +3,321 @@
 Simple HTTPS server for serving the web UI
 Only needed if you want to serve on port 8080 with HTTPS directly
 (Not needed if using nginx - which is recommended)
+
+Behind nginx, run with USE_SSL=0 (or --no-ssl) to serve plain HTTP and let
+nginx terminate TLS.
+
+Runs on asyncio (aiohttp), so TLS handshakes and transfers for concurrent
+connections don't queue behind each other.
 """
-import http.server
-import ssl
 import sys
 import os
+import ssl
+import gzip
+import mmap
+import socket
+import hashlib
+import tarfile
+import mimetypes
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+# Optional: libuv-based event loop (not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Configuration
 DEFAULT_PORT = 8080
 SSL_CERT = os.getenv('SSL_CERT', './ssl/fullchain.pem')
 SSL_KEY = os.getenv('SSL_KEY', './ssl/privkey.pem')
+USE_SSL = os.getenv('USE_SSL', '1') == '1'
 
-def main():
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+# Read size for static files; plain HTTP uses sendfile() regardless
+CHUNK_SIZE = 256 * 1024
+
+# Files up to this size are read into memory at startup and served without
+# touching the filesystem; larger ones go through the static handler
+PRELOAD_MAX_BYTES = int(os.getenv('PRELOAD_MAX_BYTES', str(64 * 1024)))
+# Caps on the whole preload, so serving a large tree can't exhaust memory;
+# files past either cap are simply left to the static handler
+PRELOAD_MAX_FILES = int(os.getenv('PRELOAD_MAX_FILES', '2000'))
+PRELOAD_MAX_TOTAL_BYTES = int(os.getenv('PRELOAD_MAX_TOTAL_BYTES', str(32 * 1024 * 1024)))
+
+# Listening socket: send buffer sized for a full static asset burst, and
+# TCP Fast Open queue length (Linux) so repeat clients save a round trip
+SO_SNDBUF_BYTES = 1 << 20
+TCP_FASTOPEN_QLEN = 5
+
+# Optional: serve the whole site from one uncompressed tar (e.g. `tar cf site.tar -C web .`)
+# instead of the current directory; SITE_ARCHIVE_PREFIX is stripped from member names
+SITE_ARCHIVE = os.getenv('SITE_ARCHIVE', '')
+SITE_ARCHIVE_PREFIX = os.getenv('SITE_ARCHIVE_PREFIX', '')
+
+# Forward-secret key exchange only, AEAD ciphers (TLS 1.2; 1.3 suites are fixed).
+# Excluding DHE means no DH parameters are ever generated or negotiated.
+SSL_CIPHERS = 'ECDHE+AESGCM:ECDHE+CHACHA20:!DHE:!kRSA'
+
+@lru_cache(maxsize=None)
+def create_ssl_context():
+    """Build the server SSLContext with session resumption on (memoized per process)."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile=SSL_CERT, keyfile=SSL_KEY)
+    # Session tickets let returning browsers skip the full handshake
+    context.options &= ~ssl.OP_NO_TICKET
+    context.set_ciphers(SSL_CIPHERS)
+    context.options |= ssl.OP_NO_COMPRESSION | ssl.OP_SINGLE_ECDH_USE
+    # No kernel TLS (ssl.OP_ENABLE_KTLS): asyncio runs TLS over MemoryBIO, so
+    # OpenSSL never owns the socket and could not hand records to the kernel
+    return context
+
+def create_listen_socket(port):
+    """Bind the listening socket with latency-oriented options.
     
-    # Check if certificate files exist
-    if not Path(SSL_CERT).exists():
-        print(f"❌ Error: Certificate not found at {SSL_CERT}")
-        print(f"   Run: ./scripts/generate-ssl-cert.sh hanweir.146sharon.com ./ssl")
-        sys.exit(1)
+    Accepted connections inherit TCP_NODELAY and SO_SNDBUF from it.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SO_SNDBUF_BYTES)
+    if hasattr(socket, 'TCP_FASTOPEN'):
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN, TCP_FASTOPEN_QLEN)
+        except OSError:
+            pass  # Disabled by net.ipv4.tcp_fastopen
+    sock.bind(('0.0.0.0', port))
+    return sock
+
+def warm_up_ssl(context):
+    """Run one in-memory handshake against context.
+    
+    OpenSSL initializes algorithm tables, curves and its RNG lazily; doing it
+    here keeps that cost off the first real client. Failures are ignored.
+    """
+    client_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+    client_in, client_out, server_in, server_out = (ssl.MemoryBIO() for _ in range(4))
+    client = client_context.wrap_bio(client_in, client_out)
+    server = context.wrap_bio(server_in, server_out, server_side=True)
+    
+    pending = [client, server]
+    try:
+        for _ in range(10):
+            for end in list(pending):
+                try:
+                    end.do_handshake()
+                    pending.remove(end)
+                except ssl.SSLWantReadError:
+                    pass
+            server_in.write(client_out.read())
+            client_in.write(server_out.read())
+            if not pending:
+                break
+    except ssl.SSLError:
+        pass
+
+def preload_files(root, max_bytes, max_files, max_total_bytes):
+    """Read small, non-hidden files under root into {url_path: (body, content_type)}.
+    
+    Stops once max_files files or max_total_bytes bytes have been read.
+    """
+    files = {}
+    total_bytes = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            if name.startswith('.'):
+                continue
+            if len(files) >= max_files:
+                add_directory_indexes(files)
+                return files
+            path = os.path.join(dirpath, name)
+            size = os.path.getsize(path)
+            if size > max_bytes or total_bytes + size > max_total_bytes:
+                continue
+            total_bytes += size
+            with open(path, 'rb') as f:
+                body = f.read()
+            url_path = '/' + os.path.relpath(path, root).replace(os.sep, '/')
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            files[url_path] = (body, content_type)
+    add_directory_indexes(files)
+    return files
+
+def add_directory_indexes(files):
+    """Alias each preloaded '<dir>/index.html' as '<dir>/', as http.server did."""
+    for url_path in [p for p in files if p.endswith('/index.html')]:
+        files[url_path[:-len('index.html')]] = files[url_path]
+
+def load_archive(path, prefix=''):
+    """Map an uncompressed tar and index it as {url_path: (body, content_type)}.
+    
+    Bodies are zero-copy views into the mapping, so the archive is opened once
+    and requests never touch the filesystem.
+    """
+    files = {}
+    with open(path, 'rb') as f:
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    with tarfile.open(path, 'r:') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            name = member.name
+            if name.startswith('./'):
+                name = name[2:]
+            if prefix and name.startswith(prefix):
+                name = name[len(prefix):]
+            name = name.lstrip('/')
+            if not name or any(part.startswith('.') for part in name.split('/')):
+                continue
+            body = data[member.offset_data:member.offset_data + member.size]
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            files['/' + name] = (body, content_type)
+    add_directory_indexes(files)
+    return files
+
+def prepare_responses(files):
+    """Turn {url_path: (body, content_type)} into ready-to-send entries.
     
-    if not Path(SSL_KEY).exists():
-        print(f"❌ Error: Private key not found at {SSL_KEY}")
-        print(f"   Run: ./scripts/generate-ssl-cert.sh hanweir.146sharon.com ./ssl")
+    Each entry is (body, etag, gzipped_body or None, gzip_etag, content_type);
+    bodies are compressed once here and kept only when gzip actually shrinks
+    them. The two codings are different representations, so each has its own ETag.
+    """
+    prepared = {}
+    by_body = {}  # '/' shares index.html's body; compress it once
+    for url_path, (body, content_type) in files.items():
+        entry = by_body.get(id(body))
+        if entry is None:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) >= len(body) * 0.9:
+                gzipped = None
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            etag, gzip_etag = '"%s"' % digest, '"%s-gz"' % digest
+            entry = by_body[id(body)] = (body, etag, gzipped, gzip_etag, content_type)
+        prepared[url_path] = entry
+    return prepared
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value lists etag (weak or strong) or is '*'."""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag == etag or tag == 'W/' + etag:
+            return True
+    return False
+
+def preload_middleware(files):
+    """Answer GET/HEAD for preloaded paths from memory."""
+    responses = prepare_responses(files)
+    
+    @web.middleware
+    async def middleware(request, handler):
+        entry = responses.get(request.path) if request.method in ('GET', 'HEAD') else None
+        if entry is None:
+            return await handler(request)
+        body, etag, gzipped, gzip_etag, content_type = entry
+        headers = {}
+        if gzipped is not None:
+            headers['Vary'] = 'Accept-Encoding'
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                headers['Content-Encoding'] = 'gzip'
+                body, etag = gzipped, gzip_etag
+        headers['ETag'] = etag
+        if etag_matches(request.headers.get('If-None-Match', ''), etag):
+            headers.pop('Content-Encoding', None)
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type=content_type, headers=headers)
+    return middleware
+
+async def directory_index(request):
+    """Serve <dir>/index.html for a directory URL; listings stay off."""
+    root = Path('.').resolve()
+    directory = (root / request.match_info.get('path', '')).resolve()
+    if directory != root and root not in directory.parents:
+        raise web.HTTPNotFound()
+    index_file = directory / 'index.html'
+    if not index_file.is_file():
+        raise web.HTTPNotFound()
+    return web.FileResponse(index_file, chunk_size=CHUNK_SIZE)
+
+def main():
+    if web is None:
+        print("❌ Error: aiohttp is not installed")
+        print("   Run: pip install aiohttp")
         sys.exit(1)
     
-    # Create server
-    server_address = ('0.0.0.0', port)
-    httpd = http.server.HTTPServer(server_address, http.server.SimpleHTTPRequestHandler)
+    args = sys.argv[1:]
+    use_ssl = USE_SSL and '--no-ssl' not in args
+    args = [a for a in args if a != '--no-ssl']
+    port = int(args[0]) if args else DEFAULT_PORT
     
-    # Wrap with SSL
-    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-    context.load_cert_chain(certfile=SSL_CERT, keyfile=SSL_KEY)
-    httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+    context = None
+    if use_ssl:
+        # Loading the chain is the existence check; only a failure is diagnosed
+        try:
+            context = create_ssl_context()
+        except FileNotFoundError as e:
+            # load_cert_chain leaves e.filename unset, so stat only in that case
+            missing = e.filename or (SSL_KEY if Path(SSL_CERT).exists() else SSL_CERT)
+            if missing == SSL_KEY:
+                print(f"❌ Error: Private key not found at {SSL_KEY}")
+            else:
+                print(f"❌ Error: Certificate not found at {missing}")
+            print(f"   Run: ./scripts/generate-ssl-cert.sh hanweir.146sharon.com ./ssl")
+            sys.exit(1)
+        except ssl.SSLError as e:
+            print(f"❌ Error: Cannot load certificate {SSL_CERT} / key {SSL_KEY}: {e}")
+            sys.exit(1)
+        warm_up_ssl(context)
     
-    print(f"🔒 Serving HTTPS on https://0.0.0.0:{port}/")
-    print(f"   Certificate: {SSL_CERT}")
-    print(f"   Press Ctrl+C to stop")
+    if SITE_ARCHIVE:
+        # Everything comes from the mapped archive; unknown paths are 404s
+        try:
+            files = load_archive(SITE_ARCHIVE, SITE_ARCHIVE_PREFIX)
+        except (OSError, tarfile.TarError) as e:
+            print(f"❌ Error: Cannot load site archive {SITE_ARCHIVE}: {e}")
+            sys.exit(1)
+        app = web.Application(middlewares=[preload_middleware(files)])
+    else:
+        # Static files from the current directory; small ones are served from memory
+        files = preload_files('.', PRELOAD_MAX_BYTES, PRELOAD_MAX_FILES, PRELOAD_MAX_TOTAL_BYTES)
+        app = web.Application(middlewares=[preload_middleware(files)])
+        app.router.add_get('/', directory_index)
+        app.router.add_get('/{path:.+}/', directory_index)
+        app.router.add_static('/', '.', chunk_size=CHUNK_SIZE)
     
     try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n👋 Server stopped")
-        sys.exit(0)
+        sock = create_listen_socket(port)
+    except OSError as e:
+        print(f"❌ Error: Cannot listen on port {port}: {e}")
+        sys.exit(1)
+    
+    if use_ssl:
+        print(f"🔒 Serving HTTPS on https://0.0.0.0:{port}/")
+        print(f"   Certificate: {SSL_CERT}")
+    else:
+        print(f"🌐 Serving HTTP on http://0.0.0.0:{port}/ (TLS terminated upstream)")
+    if SITE_ARCHIVE:
+        print(f"   Archive: {SITE_ARCHIVE} ({len(files)} files)")
+    else:
+        print(f"   Preloaded: {len(files)} files up to {PRELOAD_MAX_BYTES // 1024}KB")
+    print(f"   Event loop: {'uvloop' if uvloop is not None else 'asyncio'}")
+    print(f"   Press Ctrl+C to stop")
+    
+    # run_app handles Ctrl+C and shuts the loop down cleanly
+    loop = uvloop.new_event_loop() if uvloop is not None else None
+    web.run_app(
+        app, sock=sock, ssl_context=context,
+        print=None, access_log=None, loop=loop,
+    )
+    print("\n👋 Server stopped")
 
 if __name__ == '__main__':
     main()
-
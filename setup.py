@@ -8,6 +8,16 @@ import os
 import sys
 import subprocess
 import shutil
+import hashlib
+from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Wheel cache reused across runs (pip's default location unless overridden)
+PIP_CACHE_DIR = os.getenv('PIP_CACHE_DIR', os.path.expanduser('~/.cache/pip'))
+
+# Hash of the requirements.txt and interpreter last installed into successfully
+VENV_STAMP = Path('.venv_stamp')
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -16,72 +26,144 @@ def check_python_version():
         sys.exit(1)
     print(f"✅ Python {sys.version_info.major}.{sys.version_info.minor} detected")
 
+def requirements_satisfied(path='requirements.txt'):
+    """Check installed distributions against requirements without running pip.
+    
+    Returns False when anything is missing or out of range, or when the
+    requirements can't be checked here (no `packaging`, unparseable lines).
+    """
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        from packaging.requirements import Requirement, InvalidRequirement
+    except ImportError:
+        return False
+    
+    with open(path) as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    for line in filter(None, lines):
+        try:
+            req = Requirement(line)
+        except InvalidRequirement:
+            return False
+        if req.marker is not None and not req.marker.evaluate():
+            continue
+        try:
+            installed = version(req.name)
+        except PackageNotFoundError:
+            return False
+        if not req.specifier.contains(installed, prereleases=True):
+            return False
+    return True
+
 def install_dependencies():
-    """Install Python dependencies"""
+    """Install Python dependencies (skipped if requirements.txt is unchanged)"""
+    # Keyed by interpreter too, so switching venv or Python reinstalls
+    requirements_hash = hashlib.sha256(
+        sys.executable.encode() + b'\0' + Path('requirements.txt').read_bytes()
+    ).hexdigest()
+    if VENV_STAMP.exists() and VENV_STAMP.read_text().strip() == requirements_hash:
+        print("✅ Dependencies up to date")
+        return
+    
+    if requirements_satisfied():
+        VENV_STAMP.write_text(requirements_hash)
+        print("✅ Dependencies already installed")
+        return
+    
     print("📦 Installing Python dependencies...")
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        subprocess.check_call([
+            sys.executable, "-m", "pip", "install",
+            "--prefer-binary", "--disable-pip-version-check", "--no-input",
+            "--cache-dir", PIP_CACHE_DIR,
+            "-r", "requirements.txt",
+        ])
+        VENV_STAMP.write_text(requirements_hash)
         print("✅ Dependencies installed successfully")
     except subprocess.CalledProcessError:
         print("❌ Failed to install dependencies")
         sys.exit(1)
 
-def create_env_file():
+def create_env_file(log=print):
     """Create .env file from template if it doesn't exist"""
     if os.path.exists('.env'):
-        print("✅ .env file already exists")
+        log("✅ .env file already exists")
         return
     
     if os.path.exists('env.example'):
         shutil.copy('env.example', '.env')
-        print("✅ Created .env file from template")
-        print("⚠️  Please edit .env with your actual values")
+        log("✅ Created .env file from template")
+        log("⚠️  Please edit .env with your actual values")
     else:
-        print("❌ env.example not found")
+        log("❌ env.example not found")
 
-def check_git_safety():
+def check_git_safety(log=print):
     """Check if the repository is safe for GitHub publication"""
-    print("🔒 Checking GitHub safety...")
+    log("🔒 Checking GitHub safety...")
+    
+    # One directory listing answers every existence check below
+    with os.scandir('.') as it:
+        entries = {entry.name for entry in it}
     
     # Check if sensitive files exist
     sensitive_files = ['.env', 'credentials.json', 'token.json']
-    found_sensitive = []
-    
-    for file in sensitive_files:
-        if os.path.exists(file):
-            found_sensitive.append(file)
+    found_sensitive = [f for f in sensitive_files if f in entries]
     
     if found_sensitive:
-        print("⚠️  Found sensitive files that should not be committed:")
+        log("⚠️  Found sensitive files that should not be committed:")
         for file in found_sensitive:
-            print(f"   - {file}")
-        print("   These files are in .gitignore and will not be committed")
+            log(f"   - {file}")
+        log("   These files are in .gitignore and will not be committed")
     
     # Check .gitignore
-    if not os.path.exists('.gitignore'):
-        print("❌ .gitignore file not found - this is required for security!")
+    if '.gitignore' not in entries:
+        log("❌ .gitignore file not found - this is required for security!")
         return False
     
-    print("✅ .gitignore file found")
-    
-    # Check if sensitive files are in .gitignore
-    with open('.gitignore', 'r') as f:
-        gitignore_content = f.read()
+    log("✅ .gitignore file found")
     
     required_patterns = ['.env', 'credentials.json', 'token.json']
-    missing_patterns = []
     
-    for pattern in required_patterns:
-        if pattern not in gitignore_content:
-            missing_patterns.append(pattern)
+    inside_work_tree = shutil.which('git') is not None and subprocess.run(
+        ['git', 'rev-parse', '--is-inside-work-tree'],
+        capture_output=True, text=True,
+    ).stdout.strip() == 'true'
+    
+    if inside_work_tree:
+        # Ask git directly so every ignore rule (negations, nested files,
+        # tracked files) is applied exactly as a commit would see it
+        missing_patterns = [
+            p for p in required_patterns
+            if subprocess.run(['git', 'check-ignore', '-q', p]).returncode != 0
+        ]
+    else:
+        # Not a git checkout yet: match .gitignore patterns the way git does.
+        # The files live at the root, so a pattern containing a slash must
+        # match that root path and a bare pattern must match the name itself.
+        with open('.gitignore', 'r') as f:
+            gitignore_content = f.read()
+        
+        gitignore_globs = set()
+        for line in gitignore_content.splitlines():
+            line = line.strip()
+            if not line or line.startswith(('#', '!')) or line.endswith('/'):
+                continue
+            if line.startswith('**/'):
+                line = line[3:]
+            gitignore_globs.add(line.lstrip('/'))
+        
+        missing_patterns = [
+            p for p in required_patterns
+            if not any(fnmatchcase(p, glob) for glob in gitignore_globs)
+        ]
     
     if missing_patterns:
-        print("❌ .gitignore is missing required patterns:")
+        log("❌ .gitignore is missing required patterns:")
         for pattern in missing_patterns:
-            print(f"   - {pattern}")
+            log(f"   - {pattern}")
         return False
     
-    print("✅ .gitignore properly configured")
+    log("✅ .gitignore properly configured")
     return True
 
 def main():
@@ -92,13 +174,28 @@ def main():
     check_python_version()
     print()
     
-    install_dependencies()
-    print()
+    # The .env and .gitignore checks only touch local files, so they run while
+    # pip works; their output is buffered and shown after pip's
+    check_output = []
     
-    create_env_file()
-    print()
+    def log(*args):
+        check_output.append(" ".join(str(a) for a in args))
+    
+    def local_checks():
+        create_env_file(log)
+        log()
+        return check_git_safety(log)
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        safety = executor.submit(local_checks)
+        install_dependencies()
+        print()
+        is_safe = safety.result()
+    
+    for line in check_output:
+        print(line)
     
-    if check_git_safety():
+    if is_safe:
         print("✅ Repository is safe for GitHub publication")
     else:
         print("❌ Repository needs configuration before GitHub publication")